@@ -133,7 +133,7 @@ def ensure_extension(name, ext, partial_policy=None, partial_limit=None):
             delta = -delta
         return partial_limit is None or 0 <= delta <= partial_limit
 
-    last = len(name) - 1
+    last = len(name)
     replace = False
     if partial_type in ('append', '+'):
         if right_size(True) and ext.startswith(name[index:]):
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# haggis: a library of general purpose utilities
+#
+# Copyright (C) 2023  Joseph R. Fox-Rabinovitz <jfoxrabinovitz at gmail dot com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Author: Joseph Fox-Rabinovitz <jfoxrabinovitz at gmail dot com>
+
+
+"""
+Tests for the :py:mod:`haggis.files` module.
+"""
+
+from .. import ensure_extension
+
+
+class TestEnsureExtension:
+    def test_exact(self):
+        assert ensure_extension('a.xlsx', '.xlsx') == 'a.xlsx'
+        assert ensure_extension('a.xls', '.xlsx') == 'a.xls.xlsx'
+
+    def test_append_limit(self):
+        assert ensure_extension('a.xls', '.xlsx', 'append', 1) == 'a.xlsx'
+        assert ensure_extension('a.xl', '.xlsx', 'append', 2) == 'a.xlsx'
+        assert ensure_extension('a.xl', '.xlsx', 'append', 1) == \
+               'a.xl.xlsx'
+        assert ensure_extension('a.xls', '.xlsx', 'append', 0) == \
+               'a.xls.xlsx'
+
+    def test_insert_limit(self):
+        assert ensure_extension('b.jpg', '.jpeg', 'insert', 1) == 'b.jpeg'
+        assert ensure_extension('b.jg', '.jpeg', 'insert', 1) == \
+               'b.jg.jpeg'
+
+    def test_strip_limit(self):
+        assert ensure_extension('a.xlsx', '.xls', 'strip', 1) == 'a.xls'
+        assert ensure_extension('a.xlsx', '.xl', 'strip', 1) == \
+               'a.xlsx.xl'
+
+    def test_remove_limit(self):
+        assert ensure_extension('b.jpeg', '.jpg', 'remove', 1) == 'b.jpg'
+        assert ensure_extension('b.jpeg', '.jg', 'remove', 1) == \
+               'b.jpeg.jg'
@@ -47,17 +47,16 @@ __all__ = ['xlsx_enabled', 'EXTENSION', 'ensure_extension',]
 
 from warnings import warn
 
-from . import ensure_extension as _ensure_extension
-
 
 try:
+    from openpyxl import load_workbook
     from openpyxl.styles import Border
 except ImportError:
     from .. import _display_missing_extra
     _display_missing_extra('xlsx', 'openpyxl')
     xlsx_enabled = False
 else:
-    __all__.extend(['apply_border', 'copy_range'])
+    __all__.extend(['apply_border', 'copy_range', 'copy_range_from_file'])
     xlsx_enabled = True
 
 
@@ -76,10 +75,14 @@ def ensure_extension(output):
     ``'.xlsx'``. All other types are assumed to be proper file-like
     objects that are passed through.
     """
-    if isinstance(output, str):
-        return _ensure_extension(output, EXTENSION, partial_policy='append',
-                                 partial_limit=1)
-    return output
+    if not isinstance(output, str) or output.endswith(EXTENSION):
+        return output
+    # Equivalent to files.ensure_extension(output, EXTENSION,
+    #                                      partial_policy='append',
+    #                                      partial_limit=1)
+    if output.endswith(EXTENSION[:-1]):
+        return output + EXTENSION[-1]
+    return output + EXTENSION
 
 
 if xlsx_enabled:
@@ -120,7 +123,10 @@ if xlsx_enabled:
         ws_out : openpyxl.worksheet.worksheet.Worksheet
             The destination worksheet. If omitted, defaults to the
             source worksheet. In that case, the location being copied to
-            must be different.
+            must be different. If the destination starts immediately
+            after the last row of `ws_out`, entire rows are appended at
+            once. This is the only option supported for write-only
+            worksheets.
         row_out : int or None
             The row of the upper-left hand corner in the destination. If
             omitted, defaults to the same location as the source.
@@ -136,6 +142,11 @@ if xlsx_enabled:
         Only one of `row_in` and `column_in` may be :py:obj:`None`. All
         indices are one-based to conform to openpyxl notation.
 
+        Only the cell values are copied, not the styles. The source
+        worksheet may belong to a workbook opened in read-only mode.
+        See :py:func:`copy_range_from_file` for a convenient way to copy
+        out of a file that is not otherwise needed.
+
         Return
         ------
         n : int
@@ -161,6 +172,8 @@ if xlsx_enabled:
             mr = None if height is None else row_in + height - 1
             mc = None if width is None else column_in + width - 1
 
+        if ws_out is None:
+            ws_out = ws_in
         if row_out is None:
             row_out = row_in
         if column_out is None:
@@ -171,21 +184,78 @@ if xlsx_enabled:
             return 0
 
         iterator = ws_in.iter_rows(min_row=row_in, max_row=mr,
-                                   min_col=column_in, max_col=mc)
+                                   min_col=column_in, max_col=mc,
+                                   values_only=True)
 
         counter = 0
-        for dest_r, row in enumerate(iterator, start=row_out):
-            for dest_c, item in enumerate(row, start=column_out):
-                value = item.value
-                copy = value is not None
-                if copy or delete_empty:
-                    ws_out.cell(row=dest_r, column=dest_c).value = value
-                    if copy:
-                        counter += 1
+        if row_out == ws_out._current_row + 1:
+            # The destination is past the end of the data, so there is
+            # nothing to delete: append entire rows at once.
+            pad = [None] * (column_out - 1)
+            for row in iterator:
+                values = pad + list(row)
+                ws_out.append(values)
+                counter += sum(value is not None for value in values)
+        else:
+            cell_at = ws_out.cell
+            for dest_r, row in enumerate(iterator, start=row_out):
+                for dest_c, value in enumerate(row, start=column_out):
+                    copy = value is not None
+                    if copy or delete_empty:
+                        cell_at(dest_r, dest_c).value = value
+                        counter += copy
 
         return counter
 
 
+    def copy_range_from_file(path, sheet=None, row_in=None, column_in=None,
+                             width=None, height=None, *, ws_out, row_out=None,
+                             column_out=None, delete_empty=True):
+        """
+        Copy a range of cells from a worksheet in an existing file to
+        another worksheet.
+
+        The source workbook is opened in read-only mode, with formulas
+        replaced by their cached values. This is much faster and uses
+        much less memory than loading the entire source workbook,
+        especially for large sheets.
+
+        Parameters
+        ----------
+        path : str or file-like
+            The name of the source file, or an open file-like object
+            containing the source workbook.
+        sheet : str or int or None
+            The name or zero-based index of the source worksheet. If
+            :py:obj:`None`, use the active sheet.
+        ws_out : openpyxl.worksheet.worksheet.Worksheet
+            The destination worksheet. This argument is required, and
+            can only be passed in by keyword.
+
+        All the remaining arguments are interpreted exactly as for
+        :py:func:`copy_range`.
+
+        Return
+        ------
+        n : int
+            The number of non-empty source cells copied.
+        """
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            if sheet is None:
+                ws_in = wb.active
+            elif isinstance(sheet, str):
+                ws_in = wb[sheet]
+            else:
+                ws_in = wb.worksheets[sheet]
+            return copy_range(ws_in, row_in=row_in, column_in=column_in,
+                              width=width, height=height, ws_out=ws_out,
+                              row_out=row_out, column_out=column_out,
+                              delete_empty=delete_empty)
+        finally:
+            wb.close()
+
+
     def apply_border(ws, start_row, end_row, start_column, end_column, *,
                      merge=False, **kwargs):
         """
@@ -251,18 +321,45 @@ if xlsx_enabled:
         bottom = check_side(bottom, 'bottom')
         right = check_side(right, 'right')
 
-        for row in range(start_row, end_row + 1):
-            if left:
-                cell = ws.cell(row=row, column=start_column)
-                cell.border = cell.border + left
-            if right:
-                cell = ws.cell(row=row, column=end_column)
-                cell.border = cell.border + right
-
-        for column in range(start_column, end_column + 1):
-            if top:
-                cell = ws.cell(row=start_row, column=column)
-                cell.border = cell.border + top
-            if bottom:
-                cell = ws.cell(row=end_row, column=column)
-                cell.border = cell.border + bottom
+        def combine(first, second):
+            """
+            Merge two borders, either of which may be `None`.
+            """
+            if first is None:
+                return second
+            if second is None:
+                return first
+            return first + second
+
+        # Opposite sides of a single row or column land on the same
+        # cells, so they are combined up front.
+        if start_column == end_column:
+            columns = ((start_column, combine(left, right)),)
+        else:
+            columns = ((start_column, left), (end_column, right))
+        if start_row == end_row:
+            rows = ((start_row, combine(top, bottom)),)
+        else:
+            rows = ((start_row, top), (end_row, bottom))
+
+        cell_at = ws.cell
+
+        # Walk the perimeter once, updating each cell a single time.
+        for row, horizontal in rows:
+            for column, vertical in columns:
+                corner = combine(horizontal, vertical)
+                if corner:
+                    cell = cell_at(row, column)
+                    cell.border = cell.border + corner
+
+        for column, vertical in columns:
+            if vertical:
+                for row in range(start_row + 1, end_row):
+                    cell = cell_at(row, column)
+                    cell.border = cell.border + vertical
+
+        for row, horizontal in rows:
+            if horizontal:
+                for column in range(start_column + 1, end_column):
+                    cell = cell_at(row, column)
+                    cell.border = cell.border + horizontal
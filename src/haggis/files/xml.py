@@ -40,12 +40,22 @@ class SAXBase(ContentHandler):
     This class provides a reference to the locator. All of the actual SAX
     callback methods are currently no-ops.
     """
+    #: Location format appended to messages by :py:meth:`locate`.
+    _LONG_SUFFIX = ' in %s:%d:%d'
+
+    #: Location format appended to messages by :py:meth:`short_locate`.
+    _SHORT_SUFFIX = ' on line %d:%d'
+
+    #: Position reported when there is no locator.
+    _NO_POSITION = (float('nan'),) * 2
+
     def __init__(self):
         """
         Initialize the base classes and set the locator to `None`.
         """
         super().__init__()
         self.locator = None
+        self._system_id = None
 
     def setDocumentLocator(self, locator):
         """
@@ -55,6 +65,20 @@ class SAXBase(ContentHandler):
         message-reformatting utility method.
         """
         self.locator = locator
+        self._system_id = None
+
+    def _get_system_id(self):
+        """
+        Retrieve the system ID of the document from the currently
+        configured locator.
+
+        The system ID does not change during a parse, so it is cached
+        as soon as the locator reports one.
+        """
+        system_id = self._system_id
+        if system_id is None and self.locator is not None:
+            system_id = self._system_id = self.locator.getSystemId()
+        return system_id
 
     def _get_position(self):
         """
@@ -62,9 +86,10 @@ class SAXBase(ContentHandler):
 
         If there is no locator set, the position will be NaN.
         """
-        if self.locator is None:
-            return (float('nan'),) * 2
-        return self.locator.getLineNumber(), self.locator.getColumnNumber()
+        locator = self.locator
+        if locator is None:
+            return self._NO_POSITION
+        return locator.getLineNumber(), locator.getColumnNumber()
 
     def locate(self, message, *args, short=False):
         """
@@ -79,20 +104,22 @@ class SAXBase(ContentHandler):
         file name, the line number and the column. The short version
         only inculdes the line number and column.
         """
-        if short:
-            message += ' on line %d:%d'
-            extra = self._get_position()
+        locator = self.locator
+        if locator is None:
+            position = self._NO_POSITION
         else:
-            message += ' in %s:%d:%d'
-            extra = (self.locator.getSystemId(), *self._get_position())
-        return (message, (*args, *extra))
+            position = (locator.getLineNumber(), locator.getColumnNumber())
+        if short:
+            return (message + self._SHORT_SUFFIX, args + position)
+        return (message + self._LONG_SUFFIX,
+                args + (self._get_system_id(),) + position)
 
     def short_locate(self, message, *args):
         """
         Identical to :py:meth:`locate`, except that the file name is not
         included in the updated message.
         """
-        return (message + ' on line %d:%d', (*args, *self._get_position()))
+        return (message + self._SHORT_SUFFIX, args + self._get_position())
 
 
 class SAXLoggable(SAXBase, metaclass=MetaLoggableType):
@@ -100,18 +127,23 @@ class SAXLoggable(SAXBase, metaclass=MetaLoggableType):
     A type of :py:class:`SAXBase` that provides logging in addition to
     location methods.
     """
-    def log(self, level, msg, *args, **kwargs):
+    def log(self, level, msg, *args, short=True, **kwargs):
         """
         Append location information to a log message.
 
-        This method allows an additional keyword argument `short` that
-        determines whether or not the full file name will be present in
-        the location. `short` is :py:obj:`True` by default, meaning that
-        only the line and column number are reported.
+        This method allows an additional keyword-only argument `short`
+        that determines whether or not the full file name will be
+        present in the location. `short` is :py:obj:`True` by default,
+        meaning that only the line and column number are reported.
+
+        The location is only computed if the logger is enabled for
+        `level`.
         """
-        short = kwargs.pop('short', 'True')
+        logger = self.logger
+        if not logger.isEnabledFor(level):
+            return
         msg, args = self.locate(msg, *args, short=short)
-        self.logger.log(level, msg, *args, **kwargs)
+        logger.log(level, msg, *args, **kwargs)
 
     def setDocumentLocator(self, locator, level=None):
         """
@@ -28,13 +28,29 @@ Utilities for working with zip archives.
 __all__ = ['filter', 'remove']
 
 
-from itertools import repeat
-from os import remove as delete
-from os.path import splitext
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from os import chmod, fdopen, remove as delete, replace, stat
+from os.path import dirname, realpath, splitext
 from shutil import copyfileobj
+from stat import S_IMODE
 from tempfile import mkstemp
 from warnings import warn
-from zipfile import ZipFile, ZipInfo
+from zipfile import ZipFile
+
+from .. import Sentinel
+
+try:
+    from os import chown
+except ImportError:
+    # Not available on Windows
+    chown = None
+
+
+#: The size of the chunks used to copy unfiltered archive members and to
+#: feed streaming filters.
+_BUFFER_SIZE = 64 * 1024
 
 
 def remove(zipname, *filenames):
@@ -53,10 +69,11 @@ def remove(zipname, *filenames):
     return filter(zipname, *filenames, filter=None)
 
 
-def filter(zipname, *filenames, filter=None):
+def filter(zipname, *filenames, filter=None, workers=None):
     """
-    .. py:function:: filter_in_zip(zipname, *filenames, filter=None)
-    .. py:function:: filter_in_zip(zipname, filterDict)
+    .. py:function:: filter_in_zip(zipname, *filenames, filter=None, \\
+                                   workers=None)
+    .. py:function:: filter_in_zip(zipname, filterDict, workers=None)
 
     Modify the contents of a file or files in the specified zip archive.
 
@@ -67,63 +84,175 @@ def filter(zipname, *filenames, filter=None):
     :py:class:`zipfile.ZipInfo` objects. `filter` is a function that
     accepts a byte string with the decompressed file contents and
     returns the filtered string to replace the contents with. The
-    filtered string may be a true string or bytes.
+    filtered string may be a true string or bytes. True strings are
+    encoded as UTF-8.
 
     In the second case, `filter` is not provided separately, but rather
     as the values in a mapping. The keys are the file names to filter.
     This version is only activated when there is a single additional
-    argument besides `zipname`. In this case `filter` is completely
-    ignored.
+    argument besides `zipname`, and it is a
+    :py:class:`~collections.abc.Mapping`. In this case `filter` is
+    completely ignored.
+
+    Filters that have a truthy ``streaming`` attribute are applied
+    incrementally instead. Such a filter is called repeatedly with
+    successive chunks of the decompressed data, and must return the
+    filtered version of each chunk. The chunk boundaries are arbitrary,
+    so this is mostly useful for byte-wise transformations. Returned
+    chunks may be bytes or true strings, which are encoded as UTF-8 one
+    chunk at a time. Streaming filters can not remove a file.
+
+    If `workers` is greater than one, non-streaming filters are run
+    concurrently in a pool of that many threads, while the remaining
+    files are being copied. Decompression releases the GIL, as do many
+    filters that do their work in compiled code. Filtered data may be
+    held in memory until it can be written in the original order of
+    the archive. The default is to filter each file as it is
+    encountered.
 
     File contents ares re-inserted with the same metadata as the
     original.
+
+    The archive is not touched at all if there are no files to filter.
+    Otherwise, the modified archive is written to a temporary file in the same
+    directory as the original, which is then atomically moved into
+    place. The permissions and ownership of the original are preserved
+    whenever possible.
     """
-    if len(filenames) != 1 or isinstance(filenames[0], str) or \
-                isinstance(filenames[0], ZipInfo):
-        iter = zip(filenames, repeat(filter))
+    if len(filenames) == 1 and isinstance(filenames[0], Mapping):
+        filters = {
+            (name if isinstance(name, str) else name.filename): filter
+            for name, filter in filenames[0].items()
+        }
     else:
-        iter = filenames[0].items()
-
-    filenames = {
-        (name if isinstance(name, str) else name.filename): {
-            'count': 0, 'filter': filter
-        } for name, filter in iter
-    }
+        filters = dict.fromkeys(
+            (name if isinstance(name, str) else name.filename
+             for name in filenames), filter
+        )
+    if not filters:
+        # Nothing to do: don't rewrite the archive
+        return
+    counts = dict.fromkeys(filters, 0)
 
     # Based heavily on http://stackoverflow.com/a/4653863/2988730 and
     # http://stackoverflow.com/a/25739108/2988730.
-    temp_file, temp_name = mkstemp(suffix=splitext(zipname)[1])
-    with ZipFile(zipname, 'a') as zin, \
-                ZipFile(open(temp_file, 'wb'), 'w') as zout:
-        zout.comment = zin.comment
-        for item in zin.infolist():
-            if item.filename in filenames:
-                fileItem = filenames[item.filename]
-                fileItem['count'] += 1
-                if fileItem['filter'] is None:
-                    # Delete file
-                    data = None
-                else:
-                    # Filter file
-                    data = fileItem['filter'](zin.read(item))
-            else:
-                # Passthru file
-                data = zin.read(item)
-
-            if data is not None:
-                # Write back filtered data. Don't skip empty strings (only None).
-                zout.writestr(item, data)
-
-    # Doing it this way will preserve the file permissions
-    with open(zipname, 'wb') as fout, open(temp_name, 'rb') as fin:
-        copyfileobj(fin, fout)
-    delete(temp_name)
-
-    for name, item in filenames.items():
-        count = item['count']
+    target = realpath(zipname)
+    st = stat(target)
+    temp_file, temp_name = mkstemp(suffix=splitext(target)[1],
+                                   dir=dirname(target))
+    try:
+        _filter(zipname, temp_file, filters, counts, workers)
+        chmod(temp_name, S_IMODE(st.st_mode))
+        if chown is not None:
+            try:
+                chown(temp_name, st.st_uid, st.st_gid)
+            except OSError:
+                # Only privileged users can give away files
+                pass
+        replace(temp_name, target)
+    except BaseException:
+        delete(temp_name)
+        raise
+
+    for name, count in counts.items():
         if count > 1:
             warn('"{}" appeared "{}" times '
                  'in "{}"'.format(name, count, zipname))
         elif count == 0:
             warn('"{}" not found in "{}"'.format(name, zipname))
 
+
+def _filter(zipname, temp_file, filters, counts, workers):
+    """
+    Copy the archive `zipname` into the open file descriptor
+    `temp_file`, applying the normalized `filters` dictionary
+    constructed by :py:func:`filter`.
+
+    The number of times each filtered name is encountered is recorded
+    in `counts`.
+    """
+    # ZipFile does not close file objects that it did not open itself
+    with fdopen(temp_file, 'wb') as fout, ZipFile(zipname, 'r') as zin, \
+                ZipFile(fout, 'w') as zout:
+        zout.comment = zin.comment
+        infolist = zin.infolist()
+
+        if workers is not None and workers > 1:
+            with ThreadPoolExecutor(workers) as executor:
+                pending = {}
+                for index, item in enumerate(infolist):
+                    filter = filters.get(item.filename)
+                    if filter is not None and \
+                            not getattr(filter, 'streaming', False):
+                        pending[index] = executor.submit(
+                            _read_filtered_file, zipname, item, filter
+                        )
+                try:
+                    _copy(zin, zout, infolist, filters, counts, pending)
+                finally:
+                    # Leaving the block waits for any running filters
+                    for future in pending.values():
+                        future.cancel()
+        else:
+            _copy(zin, zout, infolist, filters, counts, {})
+
+
+def _copy(zin, zout, infolist, filters, counts, pending):
+    """
+    Copy the members in `infolist` from the open archive `zin` to
+    `zout`, applying `filters` and recording `counts` as described in
+    :py:func:`_filter`.
+
+    `pending` maps the indices of members that are already being
+    filtered in the background to their futures. Consumed futures are
+    removed from it.
+    """
+    for index, item in enumerate(infolist):
+        filter = filters.get(item.filename, Sentinel)
+        if filter is Sentinel:
+            # Passthru file: stream it without loading it all at once
+            with zin.open(item) as src, zout.open(item, 'w') as dst:
+                copyfileobj(src, dst, _BUFFER_SIZE)
+            continue
+
+        counts[item.filename] += 1
+        if filter is None:
+            # Delete file
+            continue
+        if getattr(filter, 'streaming', False):
+            # Filter file one chunk at a time
+            with zin.open(item) as src, zout.open(item, 'w') as dst:
+                for chunk in iter(partial(src.read, _BUFFER_SIZE), b''):
+                    chunk = filter(chunk)
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    dst.write(chunk)
+            continue
+        # Filter file
+        if index in pending:
+            data = pending.pop(index).result()
+        else:
+            data = _read_filtered(zin, item, filter)
+        if data is not None:
+            # Write back filtered data. Don't skip empty strings.
+            zout.writestr(item, data)
+
+
+def _read_filtered(zin, item, filter):
+    """
+    Apply `filter` to the decompressed contents of `item` in the open
+    archive `zin`.
+    """
+    return filter(zin.read(item))
+
+
+def _read_filtered_file(zipname, item, filter):
+    """
+    Apply `filter` to the decompressed contents of `item` in the
+    archive `zipname`, using a separate handle to the archive.
+
+    Meant to be run in a worker thread, so that no
+    :py:class:`~zipfile.ZipFile` object is shared between threads.
+    """
+    with ZipFile(zipname, 'r') as zin:
+        return _read_filtered(zin, item, filter)
@@ -36,13 +36,41 @@ does not rely on ``[plot]``. All the other functions work with
 .. include:: /link-defs.rst
 """
 
-import tempfile, subprocess, io
-from os import path
+import atexit, tempfile, subprocess, io, threading, warnings
+from contextlib import contextmanager
+from functools import lru_cache
+from hashlib import sha256
+from os import close, environ, makedirs, path, pipe, remove, replace, stat
+from stat import S_IWGRP, S_IWOTH
+from glob import glob
+from shutil import copyfile, copyfileobj, rmtree
+from uuid import uuid4
+
+from .string_util import check_value
+
+try:
+    from os import sendfile
+except ImportError:
+    # Not available on Windows
+    sendfile = None
+
+try:
+    from os import getuid
+except ImportError:
+    # Not available on Windows
+    getuid = None
+
+try:
+    from fcntl import fcntl, F_SETPIPE_SZ
+except ImportError:
+    # Not available on Windows, or before Python 3.10
+    F_SETPIPE_SZ = None
 
 
 __all__ = [
-    'add_use_package', 'render_latex', 'package_list',
-    'latex_exe', 'dvips_exe', 'convert_exe',
+    'add_use_package', 'render_latex', 'render_latex_batch', 'package_list',
+    'latex_exe', 'dvips_exe', 'convert_exe', 'dvipng_exe', 'dvisvgm_exe',
+    'render_latex_cache_dir',
 ]
 
 
@@ -69,17 +97,67 @@ dvips_exe = 'dvips'
 convert_exe = 'convert'
 
 
+#: The name of the :program:`dvipng` executable. Either a full path, or
+#: a program that the shell can find on the :envvar:`PATH` is necessary.
+dvipng_exe = 'dvipng'
+
+
+#: The name of the :program:`dvisvgm` executable. Either a full path, or
+#: a program that the shell can find on the :envvar:`PATH` is necessary.
+dvisvgm_exe = 'dvisvgm'
+
+
+#: The directory in which images rendered by :py:func:`render_latex`
+#: are cached. Images are keyed by a hash of the formula, the contents
+#: of :py:data:`package_list`, and all the rendering options. Set to
+#: :py:obj:`None` to disable caching. The directory is created on
+#: demand, accessible only to the current user. The default is
+#: ``haggis/latex`` in :envvar:`XDG_CACHE_HOME`, or in ``~/.cache``. A
+#: directory that belongs to another user, or that other users can
+#: write to, is never used.
+render_latex_cache_dir = path.join(
+    environ.get('XDG_CACHE_HOME') or path.join(path.expanduser('~'),
+                                               '.cache'),
+    'haggis', 'latex'
+)
+
+
+#: The contents of :py:data:`package_list` as a set, to avoid linear
+#: searches. Rebuilt whenever the lengths no longer match, in case
+#: the list was modified directly.
+_package_set = set(package_list)
+
+
 def add_use_package(package_name):
     r"""
     Add a single package via ``\usepackage{package_name}`` to the
     LaTeX premble.
     """
-    if package_name not in package_list:
-        package_list.append(package_name)
+    _register(package_name, package_list, _package_set)
+
+
+def _register(item, items, known):
+    """
+    Append `item` to the list `items` if it is not already present,
+    using the set `known` for the check.
+
+    `known` is resynchronized with `items` if their lengths differ.
+    Return :py:obj:`True` if the item was added, :py:obj:`False`
+    otherwise.
+    """
+    if len(known) != len(items):
+        known.clear()
+        known.update(items)
+    if item in known:
+        return False
+    known.add(item)
+    items.append(item)
+    return True
 
 
 def render_latex(formula, file=None, format='png', *, fontsize=12, dpi=None,
-                 transparent=False, bgcolor='white', fgcolor='black'):
+                 transparent=False, bgcolor='white', fgcolor='black',
+                 engine=None):
     """
     Render a simple LaTeX formula into an image using external programs.
 
@@ -91,66 +169,693 @@ def render_latex(formula, file=None, format='png', *, fontsize=12, dpi=None,
 
     The sequence of system commands run by this function is based
     largely on :program:`text2im` (http://www.nought.de/tex2im.php).
+    The DVI output of :program:`latex` is converted into an image by
+    one of the following engines:
+
+        ``'dvipng'``
+            :program:`dvipng` renders the DVI directly. Only PNG output
+            is supported. This is the default for ``format='png'``.
+        ``'dvisvgm'``
+            :program:`dvisvgm` renders the DVI directly. Only SVG output
+            is supported. This is the default for ``format='svg'``.
+        ``'convert'``
+            :program:`dvips` converts the DVI to PostScript, which is
+            then piped through `ImageMagick`_\ 's :program:`convert`.
+            Any format that `ImageMagick`_ understands is supported.
+            This is the default for all other formats.
+
+    Rendered images are cached in :py:data:`render_latex_cache_dir`,
+    unless it is set to :py:obj:`None`. A cached image is copied
+    directly into the output without running any of the external
+    programs. The most recently used images are also kept in memory for
+    the duration of the session. The memory cache can be emptied with
+    ``render_latex.cache_clear()``.
+
+    When the cache directory is enabled, the LaTeX preamble is also
+    precompiled into a format file with the `mylatexformat`_ package,
+    which saves having to load all the packages in
+    :py:data:`package_list` on every run. If the package is not
+    available, the preamble is processed normally.
+
+    Raise a :py:exc:`ValueError` if nothing could be rendered. Raise a
+    :py:exc:`~subprocess.CalledProcessError` if :program:`dvips` or
+    :program:`convert` fail after :program:`latex` succeeds.
+
+
+    .. include:: /link-defs.rst
     """
-    preamble = '\n'.join(r'\usepackage{%s}' % pkg for pkg in package_list)
-    content = '\n'.join([
-        r'\documentclass[{fontsize}pt]{{article}}',
-        r'{preamble}',
-        r'\usepackage[dvips]{{graphicx}}',
-        r'\pagestyle{{empty}}',
-        r'\pagecolor{{{bgcolor}}}',
-        #r'\DeclareMathSizes{{{fontsize}}}{{{fontsize}}}{{{fontsize2}}}{{{fontsize3}}}',
-        r'\begin{{document}}',
-        r'{{\color{{{fgcolor}}}',
-        r'$$ {formula} $$',
-        r'}}\end{{document}}'
-    ])
-    content = content.format(
-        preamble=preamble, formula=formula, bgcolor=bgcolor, fgcolor=fgcolor,
-        fontsize=fontsize#, fontsize2=fontsize-2, fontsize3=fontsize-4
+    engine = _select_engine(format, engine)
+    data = _render_latex_data(formula, format, fontsize, dpi, transparent,
+                              bgcolor, fgcolor, tuple(package_list), engine)
+    if file is None:
+        return io.BytesIO(data)
+    if isinstance(file, str):
+        with open(file, 'wb') as fout:
+            fout.write(data)
+    else:
+        file.write(data)
+    return file
+
+
+@lru_cache(maxsize=256)
+def _render_latex_data(formula, format, fontsize, dpi, transparent,
+                       bgcolor, fgcolor, packages, engine):
+    """
+    Retrieve the image for :py:func:`render_latex` from the disk cache,
+    or render it from scratch, and return it as :py:class:`bytes`.
+
+    Results are memoized, so `packages` must be hashable.
+    """
+    cache_dir = _private_cache_dir()
+    if cache_dir is None:
+        output = io.BytesIO()
+        _render_latex(formula, output, format, fontsize, dpi, transparent,
+                      bgcolor, fgcolor, packages, engine)
+        data = output.getvalue()
+    else:
+        key = repr((formula, format, fontsize, dpi, transparent, bgcolor,
+                    fgcolor, packages, engine))
+        cache_file = path.join(cache_dir, '{}.{}'.format(
+            sha256(key.encode('utf-8')).hexdigest(), format
+        ))
+        if not path.isfile(cache_file):
+            fd, temp_name = tempfile.mkstemp(suffix='.' + format,
+                                             dir=cache_dir)
+            close(fd)
+            try:
+                _render_latex(formula, temp_name, format, fontsize, dpi,
+                              transparent, bgcolor, fgcolor, packages,
+                              engine)
+                if path.getsize(temp_name):
+                    # Only keep successful results
+                    replace(temp_name, cache_file)
+            finally:
+                if path.exists(temp_name):
+                    remove(temp_name)
+        if path.isfile(cache_file):
+            with open(cache_file, 'rb') as fin:
+                data = fin.read()
+        else:
+            data = b''
+
+    if not data:
+        raise ValueError('Unable to render {!r}'.format(formula))
+    return data
+
+
+render_latex.cache_clear = _render_latex_data.cache_clear
+
+
+def render_latex_batch(formulas, files=None, format='png', *, fontsize=12,
+                       dpi=None, transparent=False, bgcolor='white',
+                       fgcolor='black', engine=None):
+    """
+    Render multiple LaTeX formulas into images with a single run of
+    :program:`latex`.
+
+    This is much faster than calling :py:func:`render_latex` in a loop
+    when there are many formulas to render, since the startup cost of
+    the external programs is only incurred once. Each formula is placed
+    on its own page of a ``standalone`` document, and the pages are
+    converted into separate images.
+
+    If `files` is :py:obj:`None` (the default), return a list of
+    rewound :py:class:`~io.BytesIO` objects, one for each formula.
+    Otherwise, `files` must be a sequence of file names or file-like
+    objects of the same length as `formulas`. It is returned as a list
+    after being written to.
+
+    The remaining arguments have the same meaning as for
+    :py:func:`render_latex`. Unlike :py:func:`render_latex`, the
+    results are not cached.
+
+    Raise a :py:exc:`ValueError` if any of the formulas could not be
+    rendered. All formulas share the same :program:`latex` run, so a
+    single error prevents any of the images from being rendered. Raise a
+    :py:exc:`~subprocess.CalledProcessError` if :program:`dvipng`,
+    :program:`dvisvgm`, :program:`dvips` or :program:`convert` fail
+    after :program:`latex` succeeds.
+    """
+    formulas = list(formulas)
+    if files is None:
+        files = [io.BytesIO() for _ in formulas]
+        rewind = True
+    else:
+        files = list(files)
+        rewind = False
+        if len(files) != len(formulas):
+            raise ValueError('Got {} files for {} formulas'.format(
+                len(files), len(formulas)))
+    if not formulas:
+        return files
+
+    engine = _select_engine(format, engine)
+    pagecolor = _page_color(transparent, bgcolor, engine)
+    content = _batch_template.format(
+        preamble=_make_preamble(tuple(package_list)), pagecolor=pagecolor,
+        fontsize=fontsize, formulas='\n'.join(
+            r'\begin{formula}{\color{%s}$\displaystyle %s$}\end{formula}'
+            % (fgcolor, formula) for formula in formulas
+        )
     )
+    latex = [latex_exe, '-output-format=dvi', '-halt-on-error',
+             '-interaction=batchmode', '-no-shell-escape']
+
+    with _latex_job() as job:
+        latex.append('-output-directory=' + path.dirname(job))
+        dvi = job + '.dvi'
+        _run_latex(latex, content, dvi)
+        if not path.isfile(dvi):
+            raise ValueError('Unable to render formulas')
+
+        pages = job + '-page'
+        digits = 1
+        if engine == 'dvipng':
+            command = [dvipng_exe, '-q', '-T', 'tight']
+            if dpi:
+                command.extend(['-D', str(dpi)])
+            if transparent:
+                command.extend(['-bg', 'Transparent'])
+            command.extend(['-o', pages + '%d.png', dvi])
+            proc = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+            proc.communicate()
+            _check_returncode(proc)
+            first = 1
+        elif engine == 'dvisvgm':
+            # Fix the zero-padding of the page numbers explicitly
+            digits = len(str(len(formulas)))
+            command = [dvisvgm_exe, '--no-fonts', '--page=1-',
+                       '--output={}%{}p.svg'.format(pages, digits), dvi]
+            proc = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL)
+            proc.communicate()
+            _check_returncode(proc)
+            first = 1
+        else:
+            # Each page of the PostScript becomes a separate image
+            command = [convert_exe, '+adjoin']
+            if dpi:
+                command.extend(['-density', '{0}x{0}'.format(dpi)])
+            if transparent:
+                command.extend(['-transparent', bgcolor])
+            command.extend(['-', '{}:{}%d.{}'.format(format, pages, format)])
+            first = 0
+            proc2 = subprocess.Popen([dvips_exe, '-o', '-', dvi],
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL)
+            _enlarge_pipe(proc2.stdout.fileno())
+            proc3 = subprocess.Popen(command, stdin=proc2.stdout,
+                                     stdout=subprocess.DEVNULL)
+            proc2.stdout.close()
+            proc3.wait()
+            proc2.wait()
+            _check_returncode(proc3)
+            _check_returncode(proc2)
+
+        for index, (formula, file) in enumerate(zip(formulas, files),
+                                                first):
+            page = '{}{:0{}d}.{}'.format(pages, index, digits, format)
+            if not path.isfile(page) or not path.getsize(page):
+                raise ValueError('Unable to render {!r}'.format(formula))
+            _copy_output(page, file)
+
+    if rewind:
+        for file in files:
+            file.seek(0)
+    return files
+
+
+#: The requested capacity of the pipes between the external programs
+#: run by :py:func:`render_latex`, in bytes. PostScript and image data
+#: can easily exceed the default capacity of 64KiB on Linux, which
+#: causes a lot of context switches between the processes.
+_PIPE_SIZE = 1 << 20
+
+
+#: The default engine for each output format of :py:func:`render_latex`.
+_default_engines = {'png': 'dvipng', 'svg': 'dvisvgm'}
+
+
+#: The formats supported by each engine of :py:func:`render_latex`.
+#: :py:obj:`None` means anything supported by ImageMagick.
+_engine_formats = {'dvipng': ('png',), 'dvisvgm': ('svg',), 'convert': None}
+
+
+#: The preamble of the LaTeX source used by :py:func:`render_latex`,
+#: to be filled in with :py:meth:`str.format`. This is the portion
+#: that gets precompiled by :py:func:`_get_format`.
+_document_header = '\n'.join([
+    r'\documentclass[{fontsize}pt]{{article}}',
+    r'{preamble}',
+    r'\usepackage[dvips]{{graphicx}}',
+    r'\pagestyle{{empty}}',
+    r'\csname endofdump\endcsname',
+])
+
+
+#: The body of the LaTeX source used by :py:func:`render_latex`, to be
+#: filled in with :py:meth:`str.format`, and appended to
+#: :py:data:`_document_header`.
+_document_body = '\n'.join([
+    r'{pagecolor}',
+    #r'\DeclareMathSizes{{{fontsize}}}{{{fontsize}}}{{{fontsize2}}}{{{fontsize3}}}',
+    r'\begin{{document}}',
+    r'{{\color{{{fgcolor}}}',
+    r'$$ {formula} $$',
+    r'}}\end{{document}}'
+])
+
+
+#: The LaTeX source used by :py:func:`render_latex_batch`, to be filled
+#: in with :py:meth:`str.format`.
+_batch_template = '\n'.join([
+    r'\documentclass[multi=formula,crop,{fontsize}pt]{{standalone}}',
+    r'{preamble}',
+    r'\usepackage[dvips]{{graphicx}}',
+    r'{pagecolor}',
+    r'\begin{{document}}',
+    r'{formulas}',
+    r'\end{{document}}'
+])
+
+
+@lru_cache(maxsize=4)
+def _make_preamble(packages):
+    """
+    Create the ``\\usepackage`` lines for a tuple of package names.
+
+    The result only changes when :py:data:`package_list` does, so it is
+    memoized.
+    """
+    return '\n'.join(r'\usepackage{%s}' % pkg for pkg in packages)
+
+
+#: The temporary directory shared by all the runs of the external
+#: programs. Created on demand by :py:func:`_latex_job` and removed when
+#: the interpreter exits.
+_job_dir = None
+
+
+#: Guards the creation of :py:data:`_job_dir`.
+_job_dir_lock = threading.Lock()
+
+
+@contextmanager
+def _latex_job():
+    """
+    A context manager that reserves a unique job name in the shared
+    temporary directory.
+
+    The yielded value is the full path of the job, without an
+    extension. All files starting with that path are removed when the
+    context exits. Reusing the directory saves creating and deleting
+    a new one for every image.
+    """
+    global _job_dir
+    with _job_dir_lock:
+        if _job_dir is None or not path.isdir(_job_dir):
+            _job_dir = tempfile.mkdtemp(prefix='haggis-latex-')
+            atexit.register(rmtree, _job_dir, ignore_errors=True)
+        job = path.join(_job_dir, 'job_' + uuid4().hex)
+    try:
+        yield job
+    finally:
+        for name in glob(job + '*'):
+            try:
+                remove(name)
+            except OSError:
+                pass
+
+
+#: Guards the creation of format files by :py:func:`_get_format`.
+_format_lock = threading.Lock()
+
+
+#: Format files that could not be created by :py:func:`_get_format`,
+#: so should not be attempted again.
+_failed_formats = set()
+
+
+def _get_format(header):
+    """
+    Retrieve the name of a format file containing the precompiled
+    LaTeX preamble `header`, creating it if necessary.
+
+    Format files are stored in :py:data:`render_latex_cache_dir`. The
+    returned name is suitable for the ``-fmt`` option of
+    :program:`latex`. Return :py:obj:`None` if caching is disabled, or
+    the format could not be created. An existing format file that does
+    not belong to the current user is never returned.
+    """
+    cache_dir = _private_cache_dir()
+    if cache_dir is None:
+        return None
+    name = 'haggis-' + sha256(
+        '{}\n{}'.format(latex_exe, header).encode('utf-8')
+    ).hexdigest()
+    fmt = path.join(cache_dir, name)
+    with _format_lock:
+        if fmt in _failed_formats:
+            return None
+        if path.isfile(fmt + '.fmt'):
+            if not _is_owned(fmt + '.fmt'):
+                return None
+        else:
+            with tempfile.TemporaryDirectory(dir=cache_dir) as tmpdir:
+                source = path.join(tmpdir, 'preamble.tex')
+                with open(source, 'w') as fout:
+                    fout.write(header)
+                    fout.write('\n\\begin{document}\n\\end{document}\n')
+                ini = [latex_exe, '-ini', '-halt-on-error', '-jobname=' + name,
+                       '&latex', 'mylatexformat.ltx', 'preamble.tex']
+                subprocess.Popen(ini, cwd=tmpdir, stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL).communicate()
+                output = path.join(tmpdir, name + '.fmt')
+                if not path.isfile(output):
+                    _failed_formats.add(fmt)
+                    return None
+                replace(output, fmt + '.fmt')
+    return fmt
+
+
+def _is_owned(name):
+    """
+    Check if the file or directory `name` belongs to the current user.
+
+    Always :py:obj:`True` on systems without user IDs.
+    """
+    return getuid is None or stat(name).st_uid == getuid()
+
+
+def _private_cache_dir():
+    """
+    Return :py:data:`render_latex_cache_dir`, creating it if necessary.
+
+    Return :py:obj:`None` if caching is disabled. A warning is issued
+    and :py:obj:`None` is returned if the directory belongs to another
+    user, or can be written by anyone besides its owner, since its
+    contents could then have been planted.
+    """
+    cache_dir = render_latex_cache_dir
+    if cache_dir is None:
+        return None
+    makedirs(cache_dir, mode=0o700, exist_ok=True)
+    # Write permissions are meaningless without user IDs
+    shared = getuid is not None and stat(cache_dir).st_mode & (S_IWGRP |
+                                                               S_IWOTH)
+    if shared or not _is_owned(cache_dir):
+        warnings.warn('Not caching LaTeX output in {!r}, which is not '
+                      'private to the current user'.format(cache_dir))
+        return None
+    return cache_dir
+
+
+def _select_engine(format, engine):
+    """
+    Verify that `engine` can render `format`, or pick the default
+    engine for `format` if `engine` is :py:obj:`None`.
+    """
+    if engine is None:
+        return _default_engines.get(format.casefold(), 'convert')
+    engine = check_value(engine, tuple(_engine_formats), label='engine')
+    formats = _engine_formats[engine]
+    if formats is not None and format.casefold() not in formats:
+        raise ValueError('Engine "{}" does not support format '
+                         '"{}"'.format(engine, format))
+    return engine
+
+
+def _enlarge_pipe(fd):
+    """
+    Attempt to increase the capacity of the pipe `fd` to
+    :py:data:`_PIPE_SIZE` where the OS supports it.
+    """
+    if F_SETPIPE_SZ is not None:
+        try:
+            fcntl(fd, F_SETPIPE_SZ, _PIPE_SIZE)
+        except OSError:
+            # The limit for unprivileged users may be lower
+            pass
+
+
+def _file_descriptor(file):
+    """
+    Return the OS-level file descriptor of the file-like object `file`,
+    or :py:obj:`None` if it does not have one.
+
+    Any buffered data is flushed, so that the descriptor can be written
+    to directly.
+    """
+    try:
+        fd = file.fileno()
+    except (AttributeError, OSError):
+        return None
+    file.flush()
+    return fd
+
+
+def _copy_output(name, file):
+    """
+    Copy the contents of the file `name` into `file`, which is either a
+    file name or a file-like object.
+
+    The data is copied by the kernel whenever possible, without passing
+    through Python. Like :py:mod:`shutil`, fall back to a regular copy
+    if the descriptor of `file` does not support that, e.g., because it
+    was opened in append mode.
+    """
+    if isinstance(file, str):
+        # Uses sendfile where available
+        copyfile(name, file)
+        return
+
+    fd = None if sendfile is None else _file_descriptor(file)
+    with open(name, 'rb') as fin:
+        if fd is None:
+            file.write(fin.read())
+            return
+        offset = 0
+        size = path.getsize(name)
+        while offset < size:
+            try:
+                sent = sendfile(fd, fin.fileno(), offset, size - offset)
+            except OSError:
+                if offset:
+                    raise
+                copyfileobj(fin, file)
+                return
+            if not sent:
+                break
+            offset += sent
+
+
+def _page_color(transparent, bgcolor, engine):
+    """
+    Create the LaTeX command that sets the background color.
+    """
+    if transparent and engine != 'convert':
+        # The DVI converters leave the page transparent by default
+        return ''
+    return r'\pagecolor{%s}' % bgcolor
+
+
+def _render_latex(formula, file, format, fontsize, dpi, transparent,
+                  bgcolor, fgcolor, packages, engine):
+    """
+    Run the external programs that implement :py:func:`render_latex`,
+    without any caching.
+
+    `file` is either a file name or an in-memory file-like object.
+    """
+    pagecolor = _page_color(transparent, bgcolor, engine)
+    header = _document_header.format(
+        preamble=_make_preamble(packages), fontsize=fontsize
+    )
+    content = header + '\n' + _document_body.format(
+        formula=formula, pagecolor=pagecolor, fgcolor=fgcolor,
+        #fontsize=fontsize, fontsize2=fontsize-2, fontsize3=fontsize-4
+    )
+    fmt = _get_format(header)
     latex = [
-        latex_exe, '-output-format=dvi', '-halt-on-error', #'-interaction=batchmode' 
-    ]
-    dvips = [dvips_exe, '-o', '-']
-    convert = [
-        convert_exe, '+adjoin', '-antialias'
+        latex_exe, '-output-format=dvi', '-halt-on-error',
+        '-interaction=batchmode', '-no-shell-escape',
     ]
 
+    with _latex_job() as job:
+        latex.append('-output-directory=' + path.dirname(job))
+        dvi = job + '.dvi'
+
+        if engine == 'convert':
+            # ImageMagick takes a while to start, so launch it now and
+            # let it wait on its input pipe while TeX runs
+            proc3, write = _start_convert(file, format, dpi,
+                                          transparent, bgcolor)
+            try:
+                _run_latex(latex, content, dvi, fmt)
+            except BaseException:
+                _cancel_convert(proc3, write)
+                raise
+            if path.isfile(dvi):
+                _finish_convert(dvi, file, proc3, write)
+            else:
+                # Nothing gets written, which is reported by the caller
+                _cancel_convert(proc3, write)
+        else:
+            _run_latex(latex, content, dvi, fmt)
+            if not path.isfile(dvi):
+                return
+            if engine == 'dvipng':
+                _run_dvipng(dvi, file, dpi, transparent)
+            else:
+                _run_dvisvgm(dvi, file)
+
+
+def _run_latex(latex, content, dvi, fmt=None):
+    """
+    Run the `latex` command line on the TeX source in `content`.
+
+    The source is written to a file next to the expected output `dvi`,
+    with the same base name. If a precompiled format `fmt` is supplied,
+    it is tried first. The command is rerun without it if `dvi` does
+    not appear, e.g., because the format was created by a different
+    version of TeX.
+    """
+    directory, name = path.split(path.splitext(dvi)[0])
+    source = name + '.tex'
+    with open(path.join(directory, source), 'w', encoding='utf-8') as fout:
+        fout.write(content)
+
+    commands = [latex]
+    if fmt is not None:
+        commands.insert(0, latex + ['-fmt=' + fmt])
+    for command in commands:
+        # Relative name avoids trouble with special characters in paths
+        subprocess.Popen(command + [source], cwd=directory,
+                         stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL).wait()
+        if path.isfile(dvi):
+            break
+
+
+def _run_dvipng(dvi, file, dpi, transparent):
+    """
+    Convert `dvi` directly into a PNG image with :program:`dvipng`.
+    """
+    dvipng = [dvipng_exe, '-q', '-T', 'tight']
+    if dpi:
+        dvipng.extend(['-D', str(dpi)])
+    if transparent:
+        dvipng.extend(['-bg', 'Transparent'])
+
+    # dvipng can only write to a named file
+    if isinstance(file, str):
+        output = file
+    else:
+        output = path.splitext(dvi)[0] + '.png'
+    dvipng.extend(['-o', output, dvi])
+    subprocess.Popen(dvipng, stdout=subprocess.DEVNULL).communicate()
+
+    if output is not file:
+        _copy_output(output, file)
+
+
+def _run_dvisvgm(dvi, file):
+    """
+    Convert `dvi` directly into an SVG image with :program:`dvisvgm`.
+    """
+    dvisvgm = [dvisvgm_exe, '--no-fonts', '--stdout', dvi]
+    if isinstance(file, str):
+        with open(file, 'wb') as fout:
+            subprocess.Popen(dvisvgm, stdout=fout,
+                             stderr=subprocess.DEVNULL).communicate()
+    else:
+        data, _ = subprocess.Popen(dvisvgm, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL,
+                                   bufsize=_PIPE_SIZE).communicate()
+        file.write(data)
+
+
+def _start_convert(file, format, dpi, transparent, bgcolor):
+    """
+    Start ImageMagick reading PostScript from a new pipe.
+
+    Return the process and the write end of its input pipe, which
+    should be passed to :func:`_finish_convert`.
+    """
+    convert = [convert_exe]
+
     if dpi:
         convert.extend(['-density', '{0}x{0}'.format(dpi)])
     if transparent:
         convert.extend(['-transparent', bgcolor])
 
-    rewind = False
     convert.append('-')                           # Input from pipe
     if isinstance(file, str):
         convert.append('{}:{}'.format(format, file))  # Output to file
         stdout = None
     else:
-        if file is None:
-            file = io.BytesIO()
-            rewind = True
+        # In-memory streams need to be written manually
         convert.append(format + ':-')             # Output to pipe
-        stdout = file
+        stdout = subprocess.PIPE
+
+    read, write = pipe()
+    _enlarge_pipe(write)
+    try:
+        proc3 = subprocess.Popen(convert, stdin=read, stdout=stdout,
+                                 bufsize=_PIPE_SIZE)
+    except BaseException:
+        close(write)
+        raise
+    finally:
+        close(read)
+    return proc3, write
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        latex.append('-output-directory=' + tmpdir)
-        proc1 = subprocess.Popen(latex, stdin=subprocess.PIPE,
-                                 stdout=subprocess.DEVNULL,
-                                 universal_newlines=True)
-        proc1.communicate(input=content)
 
-        dvips.extend(['-E', path.join(tmpdir, 'texput.dvi')])
-        proc2 = subprocess.Popen(dvips, stdin=None, stdout=subprocess.PIPE,
+def _finish_convert(dvi, file, proc3, write):
+    """
+    Feed `dvi` through :program:`dvips` into the ImageMagick process
+    started by :func:`_start_convert`.
+    """
+    dvips = [dvips_exe, '-o', '-', '-E', dvi]
+    try:
+        proc2 = subprocess.Popen(dvips, stdin=None, stdout=write,
                                  stderr=subprocess.DEVNULL)
-        proc3 = subprocess.Popen(convert, stdin=proc2.stdout, stdout=stdout)
-        proc2.stdout.close()
-        proc3.communicate()
+    finally:
+        close(write)
+    if proc3.stdout is None:
+        # Output goes directly to a file
+        proc3.wait()
+    else:
+        with proc3.stdout:
+            data = proc3.stdout.read()
+        proc3.wait()
+        file.write(data)
+    proc2.wait()
+    # A failure in convert makes dvips fail too, so check it first
+    _check_returncode(proc3)
+    _check_returncode(proc2)
+
+
+def _cancel_convert(proc3, write):
+    """
+    Terminate the ImageMagick process started by
+    :func:`_start_convert` without sending it any input.
+    """
+    close(write)
+    proc3.kill()
+    proc3.wait()
+    if proc3.stdout is not None:
+        proc3.stdout.close()
 
-    if rewind:
-        file.seek(0)
-    return file
+
+def _check_returncode(proc):
+    """
+    Raise a :py:exc:`~subprocess.CalledProcessError` if the finished
+    process `proc` did not exit successfully.
+    """
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
 
 
 # Do this first to verify the [plot] extra
@@ -201,6 +906,11 @@ if mpl_util.plot_enabled:
             add_use_package(package)
 
 
+    #: The contents of the preamble lists in
+    #: :py:data:`matplotlib.rcParams` as sets, keyed by the RC key.
+    _preamble_sets = {}
+
+
     def add_use_package(package_name):
         r"""
         Add a single package via ``\usepackage{package_name}`` to the
@@ -214,14 +924,12 @@ if mpl_util.plot_enabled:
 
         .. include:: /link-defs.rst
         """
-        if package_name not in package_list:
-            package_list.append(package_name)
+        _register(package_name, package_list, _package_set)
 
         def set_preamble(which):
             preamble = matplotlib.rcParams.setdefault(which, [])
-            use_str = r'\usepackage{%s}' % package_name
-            if use_str not in preamble:
-                preamble.append(use_str)
+            known = _preamble_sets.setdefault(which, set())
+            _register(r'\usepackage{%s}' % package_name, preamble, known)
 
         if matplotlib.get_backend() == 'pgf':
             set_preamble('pgf.preamble')
@@ -243,17 +951,141 @@ if mpl_util.plot_enabled:
         All arguments besides `file` and `fontsize` are passed through to
         :py:meth:`matplotlib.figure.Figure.savefig`.
 
+        The most recently rendered images are kept in memory, keyed by
+        the arguments, the backend, and the LaTeX settings in
+        :py:data:`matplotlib.rcParams`. The cache can be emptied with
+        ``render_latex_mpl.cache_clear()``, which is necessary if other
+        settings, such as fonts, are changed. Images rendered with
+        unhashable arguments are not cached.
+
         This method is based on the following Stack Overflow answer:
         http://stackoverflow.com/a/31371907/2988730
 
 
         .. include:: /link-defs.rst
         """
-        with mpl_util.figure_context(figsize=(0.01, 0.01)) as fig:
-            fig.text(0, 0, u'${}$'.format(formula), fontsize=fontsize,
-                     horizontalalignment='left', verticalalignment='bottom')
-            fig.frameon = False
-            return mpl_util.save_figure(fig, file, bbox_inches='tight')
+        options = tuple(sorted(kwargs.items()))
+        rc = matplotlib.rcParams
+        state = (matplotlib.get_backend(), rc['text.usetex'],
+                 str(rc['text.latex.preamble']), str(rc['pgf.preamble']))
+        try:
+            hash(options)
+        except TypeError:
+            # Unhashable options can not be cached
+            data = _render_latex_mpl(formula, fontsize, kwargs, state)
+        else:
+            data = _render_latex_mpl_data(formula, fontsize, options, state)
+
+        if file is None:
+            return io.BytesIO(data)
+        if isinstance(file, str):
+            with open(file, 'wb') as fout:
+                fout.write(data)
+        else:
+            file.write(data)
+        return file
+
+
+    @lru_cache(maxsize=256)
+    def _render_latex_mpl_data(formula, fontsize, options, state):
+        """
+        Memoized version of :py:func:`_render_latex_mpl`.
+
+        `options` is a sorted tuple of the keyword arguments to
+        :py:func:`render_latex_mpl`. `state` contains all the global
+        `matplotlib`_ settings that affect the result. It is only used
+        as part of the key.
+
+
+        .. include:: /link-defs.rst
+        """
+        return _render_latex_mpl(formula, fontsize, dict(options), state)
+
+
+    def _render_latex_mpl_cache_clear():
+        """
+        Empty the memory caches of :py:func:`render_latex_mpl`.
+        """
+        _render_latex_mpl_data.cache_clear()
+        _mpl_text_bbox.cache_clear()
+
+
+    render_latex_mpl.cache_clear = _render_latex_mpl_cache_clear
+
+
+    #: The figure reused by :py:func:`_render_latex_mpl` to avoid the
+    #: cost of setting up a new one for each image. Created on demand.
+    _mpl_figure = None
+
+
+    #: Guards access to :py:data:`_mpl_figure`.
+    _mpl_lock = threading.Lock()
+
+
+    def _render_latex_mpl(formula, fontsize, kwargs, state):
+        """
+        Render an image for :py:func:`render_latex_mpl` and return it as
+        :py:class:`bytes`.
+
+        Unless the caller overrides `bbox_inches`, the tight bounding
+        box of the text is computed once per formula, font size and
+        `state`, and passed in explicitly. This saves the extra draw
+        that ``bbox_inches='tight'`` normally requires.
+        """
+        global _mpl_figure
+        with _mpl_lock:
+            if _mpl_figure is None:
+                from matplotlib.figure import Figure
+                _mpl_figure = Figure(figsize=(0.01, 0.01))
+                _mpl_figure.frameon = False
+            fig = _mpl_figure
+            if 'bbox_inches' not in kwargs:
+                pad = kwargs.get('pad_inches',
+                                 matplotlib.rcParams['savefig.pad_inches'])
+                # Non-numerical padding must be computed by matplotlib
+                if not isinstance(pad, str):
+                    bbox = _mpl_text_bbox(formula, fontsize, state)
+                    kwargs = dict(kwargs, bbox_inches=bbox.padded(pad))
+            text = _add_mpl_text(formula, fontsize)
+            try:
+                return mpl_util.save_figure(fig, **kwargs).getvalue()
+            finally:
+                text.remove()
+                # Undo the effect of the `size` argument, if any
+                fig.set_size_inches(0.01, 0.01)
+
+
+    @lru_cache(maxsize=256)
+    def _mpl_text_bbox(formula, fontsize, state):
+        """
+        Compute the bounding box of a formula on :py:data:`_mpl_figure`
+        in inches.
+
+        `state` contains all the global `matplotlib`_ settings that
+        affect the result. It is only used as part of the key. This
+        function must be called with :py:data:`_mpl_lock` held.
+
+
+        .. include:: /link-defs.rst
+        """
+        text = _add_mpl_text(formula, fontsize)
+        try:
+            return text.get_window_extent().transformed(
+                _mpl_figure.dpi_scale_trans.inverted()
+            )
+        finally:
+            text.remove()
+
+
+    def _add_mpl_text(formula, fontsize):
+        """
+        Add a formula to :py:data:`_mpl_figure`, and return the text
+        object.
+        """
+        return _mpl_figure.text(0, 0, u'${}$'.format(formula),
+                                fontsize=fontsize,
+                                horizontalalignment='left',
+                                verticalalignment='bottom')
 
 
 if __name__ == '__main__':
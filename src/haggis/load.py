@@ -34,9 +34,10 @@ from collections import deque
 from importlib import import_module
 from importlib.util import spec_from_loader, module_from_spec
 from importlib.machinery import SourceFileLoader
-from inspect import ismodule, isclass, isfunction
-from os.path import basename, splitext
+from os import stat
+from os.path import basename, realpath, splitext
 import sys
+from types import FunctionType, ModuleType
 
 
 def load_object(name):
@@ -48,13 +49,36 @@ def load_object(name):
     module-level attribute to load. The path is expected to be
     accessible from the normal Python path.
     """
-    path = name.split('.')
-    name = path[-1]
-    path = '.'.join(path[:-1])
+    path, _, name = name.rpartition('.')
     module = import_module(path)
     return getattr(module, name)
 
 
+class _CachedSourceFileLoader(SourceFileLoader):
+    """
+    A source file loader that keeps compiled code in memory.
+
+    :py:class:`~importlib.machinery.SourceFileLoader` already uses the
+    bytecode in ``__pycache__`` when it is available, but it still has
+    to read and unmarshal it every time. Nothing is cached at all if
+    bytecode writing is disabled or the directory is not writable. The
+    code object is only reused for as long as the modification time
+    and size of the source file remain unchanged.
+    """
+    #: Maps file paths to ``(mtime, size, code)`` tuples.
+    _code_cache = {}
+
+    def get_code(self, fullname):
+        st = stat(self.path)
+        cached = self._code_cache.get(self.path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns,
+                                                 st.st_size):
+            return cached[2]
+        code = super().get_code(fullname)
+        self._code_cache[self.path] = (st.st_mtime_ns, st.st_size, code)
+        return code
+
+
 def load_module(module, name=None, sys_module=False,
                 injection_var=None, injection=None):
     """
@@ -88,7 +112,7 @@ def load_module(module, name=None, sys_module=False,
     mod_name = name if name else splitext(basename(module))[0]
     # str(module) necessary because import machinery does't accept Paths
     mod_spec = spec_from_loader(
-        mod_name, loader=SourceFileLoader(mod_name, str(module))
+        mod_name, loader=_CachedSourceFileLoader(mod_name, str(module))
     )
     mod = module_from_spec(mod_spec)
     if injection_var:
@@ -135,7 +159,9 @@ def module_as_dict(module, name=None, *, injection=None, injection_var=None,
     override values set by the root module that this function is called
     with. In the model for which this function was developed,
     configuration files can reference and override default static
-    configurations provided externally through include files.
+    configurations provided externally through include files. Each
+    file is loaded at most once, as identified by its real path, so
+    includes may be repeated or even circular.
 
     Parameters
     ----------
@@ -207,27 +233,30 @@ def module_as_dict(module, name=None, *, injection=None, injection_var=None,
         # Get the includes (so `skip_dunders` doesn't filter `include_var`)
         if include_var:
             inject = injection_spec if recurse_injection else {}
-            submodules.extend(load_module(name, None, **inject)
-                              for name in mod.get(include_var, []))
-
-        # Create a filter method
-        def filter_func(d, k, v):
-            if k in d or (skip_dunder and k.startswith('__')):
-                return False
-            if ((skip_modules and ismodule(v)) or
-                (skip_classes and isclass(v)) or
-                (skip_functions and isfunction(v))):
-                return False
-            return True
-
-        # Update the dictionary: use a generator for speed and efficiency
-        dictionary.update(item for item in mod.items()
-                          if filter_func(dictionary, *item))
+            for name in mod.get(include_var, []):
+                path = realpath(name)
+                if path not in seen:
+                    seen.add(path)
+                    submodules.append(load_module(name, None, **inject))
+
+        # Update the dictionary: inline filter avoids a call per item
+        output.update({k: v for k, v in mod.items()
+                       if k not in output
+                       and not (skip_dunder and k[:2] == '__')
+                       and not isinstance(v, skip_types)})
+
+    # Equivalent to ismodule, isclass and isfunction, but only one check
+    skip_types = tuple(t for t, flag in ((ModuleType, skip_modules),
+                                         (type, skip_classes),
+                                         (FunctionType, skip_functions))
+                       if flag)
 
     # Convert the module to a dictionary
     dictionary = {}
     submodules = deque()
     injection_spec = {'injection_var': injection_var, 'injection': injection}
+    # Files that have already been loaded, to avoid repeats and cycles
+    seen = {realpath(module)}
     # Load the root module
     submodules.append(load_module(module, name, **injection_spec))
 
@@ -32,8 +32,14 @@ to be imported alongside the builtin module.
 """
 
 import abc
+import atexit
+from functools import lru_cache
 import logging
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
 import sys
+from threading import Event, Thread
+from traceback import StackSummary, walk_stack
 import warnings
 
 from . import Sentinel
@@ -42,13 +48,31 @@ from . import Sentinel
 __all__ = [
     'KEEP', 'KEEP_WARN', 'OVERWRITE', 'OVERWRITE_WARN', 'RAISE',
     'add_logging_level', 'add_trace_level', 'configure_logger',
-    'reset_handlers',
+    'reset_handlers', 'stop_logging',
     'LogMaxFilter', 'MetaLoggableType',
 ]
 
 #: Default format string for the root logger. This string is set up by
-#: the :py:func:`configure_logger` method.
-_log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+#: the :py:func:`configure_logger` method. It uses ``{``-style
+#: formatting, and must be kept in sync with
+#: :py:meth:`_DefaultFormatter.formatMessage`.
+_log_format = '{asctime} - {name} - {levelname} - {message}'
+
+#: Formatters created by :py:func:`_get_formatter`, keyed by their
+#: format string.
+_formatter_cache = {}
+
+#: A detached logger that only serves as a container for the handlers
+#: that :py:func:`configure_logger` sets up. The handlers are run by
+#: :py:data:`_listener`, so that they can be replaced selectively with
+#: :py:func:`reset_handlers` just like the handlers of a real logger.
+_sink_logger = logging.Logger('haggis.logs.sinks')
+
+#: The listener that passes records from the queue of the root logger's
+#: :py:class:`~logging.handlers.QueueHandler` to the handlers in
+#: :py:data:`_sink_logger` on a background thread. Set up by
+#: :py:func:`configure_logger`.
+_listener = None
 
 #: When adding a new logging level, with :py:func:`add_logging_level`,
 #: silently keep the old level in case of conflict.
@@ -92,8 +116,13 @@ class MetaLoggableType(abc.ABCMeta):
     .. py:attribute:: logger
 
        This attribute is assigned to all new classes based on the name
-       and possibly :py:attr:`__namespace__`.
+       and possibly :py:attr:`__namespace__`. The logger is only
+       retrieved the first time the attribute is accessed.
     """
+    #: Loggers that have already been assigned, by channel name. This
+    #: avoids going through the locked registry of the logging manager
+    #: for classes that share a name, e.g., ones created dynamically.
+    _logger_cache = {}
 
     def __init__(cls, name, bases, dct):
         """
@@ -103,14 +132,73 @@ class MetaLoggableType(abc.ABCMeta):
         If a `__namespace__` attribute is found in the class, its contents is
         prefixed to the logger name.
         """
-        name = cls.__module__ + '.' + cls.__qualname__
         if '__namespace__' in dct:
-            name = dct['__namespace__'] + '.' + name
-        cls.logger = logging.getLogger(name)
-        dct['logger'] = cls.logger
+            cls._logger_name = \
+                f"{dct['__namespace__']}.{cls.__module__}.{cls.__qualname__}"
+        else:
+            cls._logger_name = f'{cls.__module__}.{cls.__qualname__}'
+        cls.logger = _lazy_logger
         return super().__init__(name, bases, dct)
 
 
+class _LazyLogger:
+    """
+    A descriptor that provides the :py:attr:`MetaLoggableType.logger`
+    attribute.
+
+    The first access retrieves the logger named by the ``_logger_name``
+    attribute of the class, and replaces the descriptor with it, so
+    that subsequent accesses are plain attribute lookups.
+    """
+    def __get__(self, instance, owner):
+        name = owner._logger_name
+        logger = MetaLoggableType._logger_cache.get(name)
+        if logger is None:
+            logger = logging.getLogger(name)
+            MetaLoggableType._logger_cache[name] = logger
+        if vars(owner).get('logger') is self:
+            owner.logger = logger
+        return logger
+
+
+#: The descriptor that :py:class:`MetaLoggableType` assigns to the
+#: ``logger`` attribute of every class it creates.
+_lazy_logger = _LazyLogger()
+
+
+def _is_level_func(func, original_name, exc_info, stack_info):
+    """
+    Check if `func` was created by :py:func:`add_logging_level` with the
+    specified defaults.
+    """
+    return (callable(func) and
+            getattr(func, '_original_name', None) == original_name and
+            getattr(func, '_exc_info', None) == exc_info and
+            getattr(func, '_stack_info', None) == stack_info)
+
+
+def _is_registered(level_name, level_num, method_name, exc_info,
+                   stack_info):
+    """
+    Check if a level is fully registered exactly as
+    :py:func:`add_logging_level` would register it with the same
+    arguments.
+
+    The check is done without holding the logging lock. A registration
+    that is in progress will simply not match.
+    """
+    def matches(func, original_name):
+        return _is_level_func(func, original_name, exc_info, stack_info)
+
+    return (logging.getLevelName(level_name) == level_num and
+            vars(logging).get(level_name) == level_num and
+            matches(vars(logging).get(method_name), 'for_logging_module') and
+            matches(getattr(logging.getLoggerClass(), method_name, None),
+                    'for_logger_class') and
+            matches(getattr(logging.LoggerAdapter, method_name, None),
+                    'for_logger_adapter'))
+
+
 def add_logging_level(level_name, level_num, method_name=None,
                       if_exists=KEEP, *, exc_info=False, stack_info=False):
     """
@@ -191,30 +279,16 @@ def add_logging_level(level_name, level_num, method_name=None,
     Before adding new levels, please see the cautionary note here:
     https://docs.python.org/3/howto/logging.html#custom-levels.
     """
-    # This method was inspired by the answers to Stack Overflow post
-    # http://stackoverflow.com/q/2183233/2988730, especially
-    # http://stackoverflow.com/a/13638084/2988730
-    def for_logger_adapter(self, msg, *args, **kwargs):
-        kwargs.setdefault('exc_info', exc_info)
-        kwargs.setdefault('stack_info', stack_info)
-        self.log(level_num, msg, *args, **kwargs)
-
-    def for_logger_class(self, msg, *args, **kwargs):
-        if self.isEnabledFor(level_num):
-            kwargs.setdefault('exc_info', exc_info)
-            kwargs.setdefault('stack_info', stack_info)
-            self._log(level_num, msg, args, **kwargs)
-
-    def for_logging_module(*args, **kwargs):
-        kwargs.setdefault('exc_info', exc_info)
-        kwargs.setdefault('stack_info', stack_info)
-        logging.log(level_num, *args, **kwargs)
-
     if not method_name:
         method_name = level_name.lower()
     if method_name == level_name:
         raise ValueError('Method name must differ from level name')
 
+    if if_exists not in (OVERWRITE, OVERWRITE_WARN) and _is_registered(
+            level_name, level_num, method_name, exc_info, stack_info):
+        # Nothing to do: skip the lock and creating the methods
+        return
+
     # The number of items required for a full registration is 5
     items_found = 0
     # Items that are found complete but are not expected values
@@ -226,12 +300,8 @@ def add_logging_level(level_name, level_num, method_name=None,
         return conflict
 
     def check_func_conflict(func, name, original_name, is_func, target):
-        conflict = not (
-            callable(func) and
-            getattr(func, '_original_name', None) == original_name and
-            getattr(func, '_exc_info', None) == exc_info and
-            getattr(func, '_stack_info', None) == stack_info
-        )
+        conflict = not _is_level_func(func, original_name,
+                                      exc_info, stack_info)
         return check_conflict(
             conflict, '{} {!r} already defined in {}'.format(
                 "Function" if is_func else "Method", name, target
@@ -239,12 +309,17 @@ def add_logging_level(level_name, level_num, method_name=None,
         )
         return conflict
 
+    # Set if a warning needs to be issued once the lock is released
+    message = None
+
     # Lock because logger class and level name are queried and set
-    logging._acquireLock()
-    try:
+    with logging._lock:
         registered_num = logging.getLevelName(level_name)
         logger_class = logging.getLoggerClass()
         logger_adapter = logging.LoggerAdapter
+        # Direct lookup is equivalent to getattr for a module. Classes
+        # still need getattr to account for inherited methods.
+        logging_vars = vars(logging)
 
         if registered_num != 'Level ' + level_name:
             items_found += 1
@@ -253,7 +328,7 @@ def add_logging_level(level_name, level_num, method_name=None,
                 'in logging module'.format(level_name)
             )
 
-        current_level = getattr(logging, level_name, Sentinel)
+        current_level = logging_vars.get(level_name, Sentinel)
         if current_level is not Sentinel:
             items_found += 1
             items_conflict += check_conflict(
@@ -261,11 +336,11 @@ def add_logging_level(level_name, level_num, method_name=None,
                 'in logging module'.format(level_name)
             )
 
-        logging_func = getattr(logging, method_name, Sentinel)
+        logging_func = logging_vars.get(method_name, Sentinel)
         if logging_func is not Sentinel:
             items_found += 1
             items_conflict += check_func_conflict(
-                logging_func, method_name, for_logging_module.__name__,
+                logging_func, method_name, 'for_logging_module',
                 True, 'logging module'
             )
 
@@ -273,7 +348,7 @@ def add_logging_level(level_name, level_num, method_name=None,
         if logger_method is not Sentinel:
             items_found += 1
             items_conflict += check_func_conflict(
-                logger_method, method_name, for_logger_class.__name__,
+                logger_method, method_name, 'for_logger_class',
                 False, 'logger class'
             )
 
@@ -281,7 +356,7 @@ def add_logging_level(level_name, level_num, method_name=None,
         if adapter_method is not Sentinel:
             items_found += 1
             items_conflict += check_func_conflict(
-                adapter_method, method_name, for_logger_adapter.__name__,
+                adapter_method, method_name, 'for_logger_adapter',
                 False, 'logger adapter'
             )
 
@@ -296,33 +371,51 @@ def add_logging_level(level_name, level_num, method_name=None,
                 else:
                     problem = 'is partially configured'
                     items = items_found
-                warnings.warn(
-                    'Logging level {!r} {} already ({}/5 items): {}'.format(
-                        level_name, problem, items, action)
-                )
-
-            if if_exists in (KEEP, KEEP_WARN):
-                return
-
-        # Make sure the method names are set to sensible values, but
-        # preserve the names of the old methods for future verification.
-        def label_func(func):
-            func._original_name = func.__name__
-            func.__name__ = method_name
-            func._exc_info = exc_info
-            func._stack_info = stack_info
-        label_func(for_logging_module)
-        label_func(for_logger_class)
-        label_func(for_logger_adapter)
-
-        # Actually add the new level
-        logging.addLevelName(level_num, level_name)
-        setattr(logging, level_name, level_num)
-        setattr(logging, method_name, for_logging_module)
-        setattr(logger_class, method_name, for_logger_class)
-        setattr(logger_adapter, method_name, for_logger_adapter)
-    finally:
-        logging._releaseLock()
+                message = 'Logging level {!r} {} already ({}/5 items): ' \
+                          '{}'.format(level_name, problem, items, action)
+
+        if items_found == 0 or if_exists not in (KEEP, KEEP_WARN):
+            # This method was inspired by the answers to Stack Overflow post
+            # http://stackoverflow.com/q/2183233/2988730, especially
+            # http://stackoverflow.com/a/13638084/2988730
+            def for_logger_adapter(self, msg, *args, **kwargs):
+                kwargs.setdefault('exc_info', exc_info)
+                kwargs.setdefault('stack_info', stack_info)
+                self.log(level_num, msg, *args, **kwargs)
+
+            def for_logger_class(self, msg, *args, **kwargs):
+                if self.isEnabledFor(level_num):
+                    kwargs.setdefault('exc_info', exc_info)
+                    kwargs.setdefault('stack_info', stack_info)
+                    self._log(level_num, msg, args, **kwargs)
+
+            def for_logging_module(*args, **kwargs):
+                kwargs.setdefault('exc_info', exc_info)
+                kwargs.setdefault('stack_info', stack_info)
+                logging.log(level_num, *args, **kwargs)
+
+            # Make sure the method names are set to sensible values, but
+            # preserve the names of the old methods for future verification.
+            def label_func(func):
+                func._original_name = func.__name__
+                func.__name__ = method_name
+                func._exc_info = exc_info
+                func._stack_info = stack_info
+            label_func(for_logging_module)
+            label_func(for_logger_class)
+            label_func(for_logger_adapter)
+
+            # Actually add the new level
+            logging.addLevelName(level_num, level_name)
+            _level_to_int.cache_clear()
+            setattr(logging, level_name, level_num)
+            setattr(logging, method_name, for_logging_module)
+            setattr(logger_class, method_name, for_logger_class)
+            setattr(logger_adapter, method_name, for_logger_adapter)
+
+    # Warn outside the lock, since warnings may be captured by logging
+    if message is not None:
+        warnings.warn(message)
 
 
 def add_trace_level(if_exists=KEEP_WARN):
@@ -385,29 +478,177 @@ def LogMaxFilter(level, inclusive=True):
     if not isinstance(level, int):
         raise TypeError('Numerical level or '
                         'level that maps to number required')
-    comparator = level.__gt__ if inclusive else level.__ge__
-
-    def filter(log_record):
-        return comparator(log_record.levelno)
+    # Bind the threshold as a default to make the filter a plain compare
+    if inclusive:
+        def filter(log_record, threshold=level):
+            return log_record.levelno < threshold
+    else:
+        def filter(log_record, threshold=level):
+            return log_record.levelno <= threshold
 
     return filter
 
 
+class _BufferedHandler(MemoryHandler):
+    """
+    A :py:class:`~logging.handlers.MemoryHandler` for batching writes to
+    a log file.
+
+    Records are written to the target once `capacity` of them have
+    accumulated, as soon as a record of level
+    :py:data:`~logging.ERROR` or above arrives, or by a daemon thread
+    that flushes any pending records every `interval` seconds. No record
+    waits longer than that, even if nothing else is logged. Unlike the
+    base class, the target is closed along with this handler.
+    """
+    def __init__(self, target, capacity=512, interval=30.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target,
+                         flushOnClose=True)
+        self.interval = interval
+        self._stopped = Event()
+        self._flusher = Thread(target=self._flush_periodically,
+                               name='haggis-log-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self.interval):
+            # flush acquires the handler lock, so this is only a hint
+            if self.buffer:
+                self.flush()
+
+    def close(self):
+        self._stopped.set()
+        self._flusher.join()
+        target = self.target
+        try:
+            super().close()
+        finally:
+            if target is not None:
+                target.close()
+
+
+class _TraceWarningsFilter(logging.Filter):
+    """
+    A filter for the ``"py.warnings"`` logger that adds a stack trace
+    to logged warnings that do not already have one.
+
+    The stack is collected starting with the first frame outside the
+    :py:mod:`logging` module, just as it would be for
+    ``stack_info=True``. Only the frame locations are extracted here.
+    Looking up the source lines and formatting the stack is deferred to
+    :py:class:`_QueueListener`, which runs on the background thread.
+    """
+    def filter(self, record):
+        if record.stack_info is None:
+            frame = sys._getframe(1)
+            while frame is not None and \
+                    frame.f_code.co_filename == _logging_source:
+                frame = frame.f_back
+            stack = StackSummary.extract(walk_stack(frame),
+                                         lookup_lines=False)
+            stack.reverse()
+            record.haggis_stack = stack
+        return True
+
+
+class _QueueListener(QueueListener):
+    """
+    A :py:class:`~logging.handlers.QueueListener` that formats the
+    stacks collected by :py:class:`_TraceWarningsFilter` into the
+    ``stack_info`` of the records it dispatches.
+    """
+    def prepare(self, record):
+        stack = getattr(record, 'haggis_stack', None)
+        if stack is not None:
+            record.stack_info = 'Stack (most recent call last):\n' + \
+                                ''.join(stack.format()).rstrip('\n')
+            del record.haggis_stack
+        return record
+
+
+#: The file containing the :py:mod:`logging` module's code, used to
+#: skip logging frames when collecting stacks.
+_logging_source = logging.Logger.handle.__code__.co_filename
+
+#: The filter that :py:func:`configure_logger` installs on the
+#: ``"py.warnings"`` logger when tracing warnings.
+_trace_warnings_filter = _TraceWarningsFilter()
+
+
+class _DefaultFormatter(logging.Formatter):
+    """
+    The formatter for :py:data:`_log_format`.
+
+    The message is assembled directly from the record attributes
+    instead of by interpolating the format string into the record
+    dictionary.
+    """
+    def __init__(self):
+        super().__init__(_log_format, style='{')
+
+    def formatMessage(self, record):
+        return f'{record.asctime} - {record.name} - ' \
+               f'{record.levelname} - {record.message}'
+
+
+#: The formatter :py:func:`_get_formatter` returns by default.
+_default_formatter = _DefaultFormatter()
+
+
+@lru_cache(maxsize=64)
+def _level_to_int(level):
+    """
+    Convert a case insensitive level name into a number.
+
+    Numbers are returned as-is. Names that are not registered are
+    returned as the string that :py:func:`logging.getLevelName` makes
+    for them. The cache is cleared by :py:func:`add_logging_level`
+    whenever a level is registered.
+    """
+    if isinstance(level, str):
+        level = level.upper()
+        try:
+            return logging._nameToLevel[level]
+        except KeyError:
+            return logging.getLevelName(level)
+    return level
+
+
 def _get_formatter(format=None):
     """
     Retrieve a consistent :py:class:`~logging.Formatter` object based
     on the input format.
 
     If `format` is already a :py:class:`~logging.Formatter`, return it
-    as-is. If :py:obj:`None`, use a default format string. Otherwise, it
-    is expected to be a string that initializes a proper
-    :py:class:`~logging.Formatter` instance.
+    as-is. If :py:obj:`None`, return a formatter for the default format
+    string. Otherwise, it is expected to be a ``%``-style string that
+    initializes a proper :py:class:`~logging.Formatter` instance.
+    Formatters created from strings are cached, so handlers configured
+    with the same string share a single instance.
     """
     if isinstance(format, logging.Formatter):
         return format
     if format is None:
-        format = _log_format
-    return logging.Formatter(format)
+        return _default_formatter
+    formatter = _formatter_cache.get(format)
+    if formatter is None:
+        formatter = _formatter_cache[format] = logging.Formatter(format)
+    return formatter
+
+
+# System-level logging hook courtesy of Stack Overflow post
+# http://stackoverflow.com/a/16993115/2988730
+def _exception_handler(*args):
+    """
+    An exception hook that is meant to replace the default
+    :py:func:`sys.excepthook`. Logs all uncaught exceptions to the
+    root logger except for :py:exc:`KeyboardInterrupt`, which is
+    passed directly to the default system hook.
+    """
+    if issubclass(args[0], KeyboardInterrupt):
+        sys.__excepthook__(*args)
+    else:
+        logging.getLogger().critical("Uncaught exception", exc_info=args)
 
 
 def configure_logger(log_file=None, file_level='NOTSET',
@@ -419,7 +660,8 @@ def configure_logger(log_file=None, file_level='NOTSET',
 
     A ``TRACE`` level is added to the :py:mod:`logging` module. The
     system-level automatic exception handler is set up to log uncaught
-    errors. Warnings will always be captured by the logger, with
+    errors, unless :py:func:`sys.excepthook` has already been replaced.
+    Warnings will always be captured by the logger, with
     optional tracebacks being logged by default.
 
     Parameters
@@ -450,53 +692,43 @@ def configure_logger(log_file=None, file_level='NOTSET',
         standard error if `log_stdout` is set. Defaults to ``'INFO'``.
     format_string : str
         The log format. A missing (:py:obj:`None`) `format_string`
-        defaults to
-        ``'%(asctime)s - %(name)s - %(levelname)s - %(message)s'``. 
+        defaults to ``'{asctime} - {name} - {levelname} - {message}'``.
+        Other strings use ``%``-style formatting, e.g.
+        ``'%(asctime)s - %(name)s - %(levelname)s - %(message)s'``.
     trace_warnings : bool
         Whether or not to print tracebacks for actual warnings (not log
         entries with a warning level) caught by the Python global
-        warning logger. Defaults to :py:obj:`True`. Custom
-        :py:meth:`~logging.Logger.warning` methods are hooked into the
-        logger for ``"py.warnings"``.
-    """
-    add_trace_level()
-
-    # System-level logging hook courtesy of Stack Overflow post
-    # http://stackoverflow.com/a/16993115/2988730
-    def exception_handler(*args):
-        """
-        An exception hook that is meant to replace the default
-        :py:func:`sys.excepthook`. Logs all uncaught exceptions to the
-        root logger except for :py:exc:`KeyboardInterrupt`, which is
-        passed directly to the default system hook.
+        warning logger. Defaults to :py:obj:`True`. A filter on the
+        ``"py.warnings"`` logger attaches the stack of the code that
+        issued each warning to its record, and the background thread
+        formats it into the output as for ``stack_info=True``.
 
-        An additional hook can be called after logging the exception
-        """
-        if isinstance(args[0], KeyboardInterrupt):
-            sys.__excepthook__(*args)
-        else:
-            root.critical("Uncaught exception", exc_info=args)
+    Notes
+    -----
+    The root logger only receives a single
+    :py:class:`~logging.handlers.QueueHandler`. The file and stream
+    handlers are run on a background thread by a
+    :py:class:`~logging.handlers.QueueListener`, so that logging calls
+    do not block on I/O. Records are written to `log_file` in batches,
+    except for errors, which are written immediately. Calling this
+    function again replaces the handlers for the requested outputs, and
+    keeps the others. The thread is stopped, and all pending records
+    written, when the interpreter exits, or when :py:func:`stop_logging`
+    is called.
+    """
+    # The level is never removed, so only the first call needs this
+    if getattr(logging, 'TRACE', None) != logging.DEBUG - 5:
+        add_trace_level()
 
-    sys.excepthook = exception_handler
+    # Do not replace a hook set up by the user or by a previous call
+    if sys.excepthook is sys.__excepthook__:
+        sys.excepthook = _exception_handler
 
+    logger = logging.getLogger("py.warnings")
     if trace_warnings:
-        def warning_logger(self, msg, *args, **kwargs):
-            """
-            A replacement for the :py:meth:`~logging.Logger.warning`
-            method that is set for the ``"py.warnings"`` logger to show
-            a stack trace for logged warnings. Note that warnings logged
-            explicitly with ``logger.log(logging.WARNING, ...)`` will
-            not pass through this handler.
-            """
-            if self.isEnabledFor(logging.WARNING):
-                kwargs.setdefault('stack_info', True)
-                self._log(logging.WARNING, msg, args, **kwargs)
-
-        logger = logging.getLogger("py.warnings")
-
-        # Bind methods according to http://stackoverflow.com/a/1015405/2988730
-        logger.warning = warning_logger.__get__(logger, type(logger))
-        logger.warn = logger.warning  # For good measure
+        logger.addFilter(_trace_warnings_filter)
+    else:
+        logger.removeFilter(_trace_warnings_filter)
 
     logging.captureWarnings(True)
 
@@ -508,21 +740,94 @@ def configure_logger(log_file=None, file_level='NOTSET',
     # Apparently, stdout won't show up without this...
     root.setLevel(logging.NOTSET)
 
+    # Stop the listener while its handlers are being replaced. Records
+    # logged in the meantime stay in the queue until it restarts.
+    global _listener
+    if _listener is None:
+        queue = SimpleQueue()
+    else:
+        queue = _listener.queue
+        _listener.stop()
+        _listener = None
+    sinks = _sink_logger
+
     if log_file:
-        reset_handlers(logging.FileHandler(log_file, mode='w'),
-                       level=file_level, format=formatter, logger=root)
+        file_handler = logging.FileHandler(log_file, mode='w')
+        file_handler.setFormatter(formatter)
+        reset_handlers(_BufferedHandler(file_handler), level=file_level,
+                       format=formatter, logger=sinks)
     if log_stderr:
         reset_handlers(logging.StreamHandler(sys.stderr), level=stderr_level,
-                       format=formatter, logger=root, filter_type=True,
+                       format=formatter, logger=sinks, filter_type=True,
                        filter_hook=lambda h: h.stream == sys.stderr)
     if log_stdout:
         stdout_handler = logging.StreamHandler(sys.stdout)
         reset_handlers(stdout_handler, level=stdout_level, format=formatter,
-                       logger=root, filter_type=True,
+                       logger=sinks, filter_type=True,
                        filter_hook=lambda h: h.stream == sys.stdout)
         if log_stderr:
-            stdout_handler.addFilter(LogMaxFilter(
-                    logging.getLevelName(stderr_level), False))
+            # Equivalent to LogMaxFilter(stderr_level, True), without
+            # iterating over a list of filters for every record
+            stdout_handler.filter = \
+                lambda record, bound=_level_to_int(stderr_level): \
+                record.levelno < bound
+
+    # Only enqueue records that at least one handler will accept
+    queue_handler = QueueHandler(queue)
+    reset_handlers(queue_handler, format=logging.Formatter(), logger=root)
+    queue_handler.setLevel(min((h.level for h in sinks.handlers),
+                               default=logging.CRITICAL + 1))
+    _listener = _QueueListener(queue, *sinks.handlers,
+                               respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """
+    Shut down the logging configuration set up by
+    :py:func:`configure_logger`.
+
+    The background thread is stopped after all pending records have
+    been written, and the handlers are closed. The
+    :py:class:`~logging.handlers.QueueHandler` is removed from the root
+    logger. This function is called automatically when the interpreter
+    exits. It does nothing if logging is not configured.
+    """
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    for handler in _sink_logger.handlers:
+        handler.close()
+    _sink_logger.handlers.clear()
+    # Stacks are only formatted by the listener
+    logging.getLogger("py.warnings").removeFilter(_trace_warnings_filter)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+            handler.close()
+
+
+# Registered after logging's own shutdown hook, so runs before it
+atexit.register(stop_logging)
+
+
+def _TRUE(handler):
+    """
+    Filter that selects every handler in :py:func:`reset_handlers`.
+    """
+    return True
+
+
+def _default_remove_hook(handler):
+    """
+    Close a handler removed by :py:func:`reset_handlers` if possible.
+    """
+    close = getattr(handler, 'close', None)
+    if close is not None:
+        close()
 
 
 def reset_handlers(handler, level='NOTSET', format=None, logger=None,
@@ -583,35 +888,36 @@ def reset_handlers(handler, level='NOTSET', format=None, logger=None,
 
     if filter_hook is None:
         if filter_type is None:
-            def filter_func(h):
-                return True
+            filter_func = _TRUE
         else:
-            def filter_func(h):
-                return isinstance(h, filter_type)
+            filter_func = lambda h, t=filter_type: isinstance(h, t)
+    elif filter_type is None:
+        filter_func = filter_hook
     else:
-        if filter_type is None:
-            filter_func = filter_hook
-        else:
-            def filter_func(h):
-                return isinstance(h, filter_type) and filter_hook(h)
+        filter_func = lambda h, t=filter_type, f=filter_hook: \
+            isinstance(h, t) and f(h)
 
     if remove_hook is None:
-        def remove_hook(h):
-            if hasattr(h, 'close') and callable(h.close):
-                h.close()
+        remove_hook = _default_remove_hook
+
+    # The handler is not shared yet, so it does not need the lock
+    handler.setLevel(_level_to_int(level))
+    handler.setFormatter(_get_formatter(format))
 
-    logging._acquireLock()
-    try:
+    with logging._lock:
         if logger is None:
             logger = logging.getLogger()
 
-        for h in list(logger.handlers):
-            if filter_func(h):
-                remove_hook(h)
+        if filter_func is _TRUE:
+            # Everything goes, so skip removeHandler for each item
+            to_remove = logger.handlers[:]
+            logger.handlers.clear()
+        else:
+            to_remove = [h for h in logger.handlers if filter_func(h)]
+            for h in to_remove:
                 logger.removeHandler(h)
 
-        handler.setLevel(logging.getLevelName(level))
-        handler.setFormatter(_get_formatter(format))
+        for h in to_remove:
+            remove_hook(h)
+
         logger.addHandler(handler)
-    finally:
-        logging._releaseLock()
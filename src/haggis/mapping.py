@@ -36,14 +36,28 @@ __all__ = [
 ]
 
 
-from collections.abc import Mapping
+from collections.abc import Collection, Mapping, Set
 from itertools import starmap
+import operator
 from warnings import warn
 
-from .exceptions import ErrorTransform
+from . import Sentinel
 from .recipes import consume
 
 
+#: The default :py:attr:`mapping_context.sentinel`. A single private
+#: instance is enough, since it only has to be absent from the mapping.
+_MISSING = object()
+
+
+def _as_set(keys):
+    """
+    Convert `keys` to a :py:class:`set`, unless it already supports set
+    operations, as do :py:class:`frozenset` and :py:meth:`dict.keys`.
+    """
+    return keys if isinstance(keys, Set) else set(keys)
+
+
 def dict_select(dic, keys=None, exclude=None, extra='ignore'):
     """
     Filter a dictionary so only the specified keys are present.
@@ -78,30 +92,54 @@ def dict_select(dic, keys=None, exclude=None, extra='ignore'):
     ------
     selection : dict
         A new `dict` object, even if `keys` is a superset of the actual
-        keys found in `dic`.
+        keys found in `dic`. The keys are in the order of `keys`, or of
+        `dic` if `keys` is :py:obj:`None`.
 
     Notes
     -----
     The default behavior is just to make a copy of `dic`.
     """
-    input_keys = set(dic.keys())
-    select_keys = input_keys if keys is None else set(keys)
-    exclude_keys = set() if exclude is None else set(exclude)
+    if extra not in ('ignore', 'warn', 'err'):
+        raise ValueError('Invalid value of `extra`: "{}"'.format(extra))
+
+    if keys is None and exclude is None and extra == 'ignore':
+        return dict(dic)
+
+    exclude_keys = frozenset() if exclude is None else _as_set(exclude)
 
     if extra != 'ignore':
-        extra_keys = (input_keys - select_keys) - exclude_keys
+        # Key views support set operations without copying
+        input_keys = dic.keys()
+        if keys is not None:
+            # Keep the original order of keys for the selection itself
+            if not isinstance(keys, Collection):
+                keys = list(keys)
+            extra_keys = (input_keys - _as_set(keys)) - exclude_keys
+        else:
+            extra_keys = ()
         extra_fmt = ', '.join(str(k) for k in extra_keys)
         message = 'Found extra keys: {}'.format(extra_fmt)
         if extra == 'warn':
             warn(message)
-        elif extra == 'err':
-            raise KeyError(message)
         else:
-            raise ValueError('Invalid value of `extra`: "{}"'.format(extra))
+            raise KeyError(message)
 
-    selection = (input_keys & select_keys) - exclude_keys
+    return _dict_select(dic, keys, exclude_keys)
 
-    return {k: dic[k] for k in selection}
+
+def _dict_select(dic, keys, exclude_keys):
+    """
+    The selection part of :py:func:`dict_select`, for arguments that
+    have already been normalized.
+
+    `keys` may be :py:obj:`None` or a reusable iterable, and
+    `exclude_keys` must support fast containment checks.
+    """
+    if keys is None:
+        if not exclude_keys:
+            return dict(dic)
+        return {k: v for k, v in dic.items() if k not in exclude_keys}
+    return {k: dic[k] for k in keys if k in dic and k not in exclude_keys}
 
 
 def dict_merge(parent, child, keys=None, exclude=None, key=None):
@@ -142,11 +180,19 @@ def dict_merge(parent, child, keys=None, exclude=None, key=None):
         The selected values of `parent`, possibly overriden by `child`
         if it is a mapping.
     """
-    selection = dict_select(parent, keys, exclude)
-    cmap = isinstance(child, Mapping)
+    # Normalize the arguments once for both selections
+    if keys is not None and not isinstance(keys, Collection):
+        keys = list(keys)
+    exclude_keys = frozenset() if exclude is None else _as_set(exclude)
+
+    selection = _dict_select(parent, keys, exclude_keys)
+    # Check the common cases before going through the ABC machinery
+    cmap = isinstance(child, dict) or (
+        child is not None and isinstance(child, Mapping)
+    )
 
     if cmap:
-        selection.update(dict_select(child, keys, exclude))
+        selection.update(_dict_select(child, keys, exclude_keys))
 
     if key is None:
         return selection
@@ -183,23 +229,30 @@ def setdefaults(mapping, *args, **kwargs):
         Any additional keywords to insert. These are applied after the
         iterables, if any.
     """
-    # Find suitable setdefault implementation
-    if hasattr(mapping, 'setdefault') and callable(mapping.setdefault):
-        func = mapping.setdefault
-    else:
+    # Find suitable setdefault implementation. For a dict, starmap over
+    # the bound setdefault runs entirely in C, so there is no faster way.
+    func = getattr(mapping, 'setdefault', None)
+    if not callable(func):
+        # Bind the special methods once instead of going through the
+        # operators for every key. Without __contains__, `in` iterates.
+        cls = type(mapping)
+        contains = getattr(cls, '__contains__', operator.contains)
+        getitem = cls.__getitem__
+        setitem = cls.__setitem__
+
         def func(key, default):
-            if not key in mapping:
-                ret = mapping[key] = default
-            else:
-                ret = mapping[key]
+            if contains(mapping, key):
+                return getitem(mapping, key)
+            setitem(mapping, key, default)
             # For correctness
-            return ret
+            return default
 
     for arg in args:
         if isinstance(arg, Mapping):
             arg = arg.items()
         consume(starmap(func, arg))
-    consume(starmap(func, kwargs.items()))
+    if kwargs:
+        consume(starmap(func, kwargs.items()))
 
 
 class RecursiveDict(dict):
@@ -286,10 +339,12 @@ class RecursiveDict(dict):
         The default value is set exactly as specified, but the return
         value is dereferenced.
         """
-        if key in self:
-            return self[key]
+        value = dict.get(self, key, Sentinel)
+        if value is not Sentinel:
+            self._check_key_type(key)
+            return self._conditional_get(value)[1]
         self[key] = default
-        return self._conditional_get(default)[1]
+        return self._dereference_default(default)
 
     def get(self, key, default=None):
         """
@@ -298,9 +353,11 @@ class RecursiveDict(dict):
 
         `default` gets dereferenced if the key is not present.
         """
-        if key in self:
-            return self[key]
-        return self._conditional_get(default)[1]
+        value = dict.get(self, key, Sentinel)
+        if value is not Sentinel:
+            self._check_key_type(key)
+            return self._conditional_get(value)[1]
+        return self._dereference_default(default)
 
     def final_key(self, key):
         """
@@ -327,6 +384,21 @@ class RecursiveDict(dict):
         """
         return self._conditional_get(key, iskey=True, err=False)[0]
 
+    def _dereference_default(self, default):
+        """
+        Dereference the default value of :py:meth:`get` or
+        :py:meth:`setdefault`.
+
+        A default that can not be a key is returned directly (once its
+        type is verified), without going through
+        :py:meth:`_conditional_get`.
+        """
+        key_type = self.key_type
+        if key_type is not None and not isinstance(default, key_type) and \
+                self._check_value_type(default):
+            return default
+        return self._conditional_get(default)[1]
+
     def _conditional_get(self, obj, iskey=False, err=True):
         """
         Check if the object is a possible key, and correctly retrieve
@@ -346,18 +418,34 @@ class RecursiveDict(dict):
         err : bool
             Whether or not to raise an error if the key is not found.
         """
+        # The type checks are inlined here because this is the hot loop
+        # for all lookups: they are equivalent to
+        # _check_key_or_value_type and _check_value_type.
+        key_type = self.key_type
+        value_type = self.value_type
+        # The unbound method avoids creating a super object per lookup
+        get = dict.get
+
         key = obj if iskey else None
-        while self._check_key_or_value_type(obj, iskey=iskey):
-            try:
-                new = super().__getitem__(obj)
-            except KeyError:
-                if err and (iskey or
-                            not self._check_value_type(obj, err=False)):
-                    raise
+        while True:
+            if key_type is not None and not isinstance(obj, key_type):
+                if iskey:
+                    raise TypeError('{} not allowed for keys'.format(
+                        type(obj)))
+                if value_type is not None and \
+                        not isinstance(obj, value_type):
+                    raise TypeError('{} not allowed in mapping'.format(
+                        type(obj)))
                 break
-            else:
-                key = obj
-                obj = new
+            # A missing key ends most lookups, so avoid raising
+            new = get(self, obj, Sentinel)
+            if new is Sentinel:
+                if err and (iskey or (value_type is not None and
+                                      not isinstance(obj, value_type))):
+                    raise KeyError(obj)
+                break
+            key = obj
+            obj = new
             iskey = False
         return key, obj
 
@@ -445,10 +533,14 @@ def option_lookup(name, mapping, option, key_func=None, value_func=None,
         If multiple types are to be expected, a :py:class:`tuple` of
         types may be supplied. Defaults to :py:exc:`KeyError`.
     """
-    with ErrorTransform(key_err, err_type, 'Invalid value for `{0}`: {1!r}',
-                        name, option):
+    # Equivalent to ErrorTransform, without the overhead on success
+    try:
         key = option if key_func is None else key_func(option)
         value = mapping[key]
+    except key_err as e:
+        raise err_type(
+            'Invalid value for `{0}`: {1!r}'.format(name, option)
+        ) from e
     # This is not in the exception handler because its your own fault:
     # Option can be anything since its user supplied, but not mapping values
     if value_func is not None:
@@ -526,7 +618,7 @@ class mapping_context:
 
         Keyword arguments are individual keys to update.
         """
-        self.sentinel = object()
+        self.sentinel = _MISSING
         self._init(mapping, *args, **kwargs)
 
     def __enter__(self):
@@ -534,6 +626,14 @@ class mapping_context:
         Enter the context manager by updating the requested
         elements, return the context manager itself.
         """
+        target = self._bulk_target()
+        if target is not None:
+            sentinel = self.sentinel
+            updates = self.updates
+            self.updates = {k: target.get(k, sentinel) for k in updates}
+            self._update_bulk(target, updates)
+            return self
+
         for key, value in self.updates.items():
             self.updates[key] = self.getfunc(key)
             self.setfunc(key, value)
@@ -543,7 +643,11 @@ class mapping_context:
         """
         Restore the elements of the mapping.
         """
-        # Convert to list to avoid modification during iteration
+        target = self._bulk_target()
+        if target is not None:
+            self._update_bulk(target, self.updates)
+            return
+
         for item in self.updates.items():
             self.setfunc(*item)
 
@@ -554,8 +658,10 @@ class mapping_context:
 
         Return the context manager itself.
         """
-        for key in keys:
-            self.updates[key] = self.sentinel
+        if len(keys) == 1:
+            self.updates[keys[0]] = self.sentinel
+        elif keys:
+            self.updates.update(dict.fromkeys(keys, self.sentinel))
         return self
 
     def chain(self, *args, **kwargs):
@@ -580,7 +686,12 @@ class mapping_context:
         cls = type(self)
         dc = cls.__new__(cls)
         dc.sentinel = self.sentinel
-        dc._init(self.mapping, *args, **kwargs)
+        if args:
+            dc._init(self.mapping, *args, **kwargs)
+        else:
+            # The usual case: kwargs is already a new dict to record
+            dc.mapping = self.mapping
+            dc.updates = kwargs
         return dc
 
     def _init(self, mapping, *args, **kwargs):
@@ -602,6 +713,36 @@ class mapping_context:
             self.updates.update(arg)
         self.updates.update(kwargs)
 
+    def _bulk_target(self):
+        """
+        Retrieve a :py:class:`dict` that can be updated in bulk instead
+        of through :py:meth:`getfunc` and :py:meth:`setfunc`, or
+        :py:obj:`None` if there is no such thing.
+
+        The default implementation returns :py:attr:`mapping` if it is
+        exactly a :py:class:`dict` and neither method is overriden.
+        """
+        cls = type(self)
+        if type(self.mapping) is dict and \
+                cls.getfunc is mapping_context.getfunc and \
+                cls.setfunc is mapping_context.setfunc:
+            return self.mapping
+        return None
+
+    def _update_bulk(self, target, values):
+        """
+        The equivalent of calling :py:meth:`setfunc` on all the items in
+        `values`, for a `target` returned by :py:meth:`_bulk_target`.
+
+        Deletions still go through :py:meth:`setfunc`, so that missing
+        keys raise the same errors.
+        """
+        sentinel = self.sentinel
+        target.update({k: v for k, v in values.items() if v is not sentinel})
+        for key, value in values.items():
+            if value is sentinel:
+                self.setfunc(key, value)
+
     def getfunc(self, key):
         """
         A customizable function to get a single element of the mapping.
@@ -671,7 +812,27 @@ class _NamespaceOverrideContext(object_context):
         Initialize a new context manager to replace the specified
         elements of the given namespace.
         """
-        super().__init__(namespace, **kwargs)
+        # Equivalent to the parent initializer, but kwargs is a new dict
+        # that does not need to be copied
+        self.sentinel = _MISSING
+        self.mapping = namespace
+        self.updates = kwargs
+
+    def _bulk_target(self):
+        """
+        Retrieve the attribute dictionary of a plain
+        :py:class:`Namespace`, which does not have any descriptors that
+        assignment could trigger.
+
+        Subclasses of :py:class:`Namespace` are always updated
+        attribute by attribute.
+        """
+        cls = type(self)
+        if type(self.mapping) is Namespace and \
+                cls.getfunc is object_context.getfunc and \
+                cls.setfunc is object_context.setfunc:
+            return self.mapping.__dict__
+        return None
 
     def __enter__(self):
         """
@@ -701,9 +862,12 @@ class Namespace:
         Key-value pairs in each iterable of `args` are added in order,
         followed by the mapping `kwargs`.
         """
-        for arg in args:
-            self.__dict__.update(arg)
-        self.__dict__.update(kwargs)
+        if args:
+            update = self.__dict__.update
+            for arg in args:
+                update(arg)
+        if kwargs:
+            self.__dict__.update(kwargs)
 
     def __contains__(self, name):
         """
@@ -31,13 +31,27 @@
 Math utility functions that are otherwise uncategorized.
 """
 
-import itertools
 import math
 import numpy
-from scipy.stats import iqr
 
 from .mapping import option_lookup
 
+try:
+    from math import isqrt as _isqrt
+except ImportError:
+    # Not available before Python 3.8
+    def _isqrt(n):
+        """
+        Compute the integer square root of non-negative `n`, correcting
+        the floating point estimate.
+        """
+        root = int(math.sqrt(n))
+        while root * root > n:
+            root -= 1
+        while (root + 1) * (root + 1) <= n:
+            root += 1
+        return root
+
 
 __all__ = [
     'ang_diff_abs', 'ang_diff_min', 'ang_diff_pos', 'count_divisors',
@@ -60,8 +74,8 @@ def round_sig(x, n):
 
 def ellipse(*args, num_points=1e3, **kwargs):
     r"""
-    .. py:function:: ellipse(a, [b=0,] c, d, e, f, *, numPoints=1e3)
-    .. py:function:: ellipse(a, b, h, k, *, theta=0, numPoints=1e3)
+    .. py:function:: ellipse(a, [b=0,] c, d, e, f, *, num_points=1e3)
+    .. py:function:: ellipse(a, b, h, k, *, theta=0, num_points=1e3)
 
     Return x-y arrays for an ellipse in one of two standard forms.
 
@@ -82,7 +96,7 @@ def ellipse(*args, num_points=1e3, **kwargs):
     (optional) angle parameter `theta`, specified in radians
     counterclockwise about ``(h, k)``.
 
-    The number of points is specified by `numPoints`. Points are evenly
+    The number of points is specified by `num_points`. Points are evenly
     distributed by angle, not by arc-length (unless the ellipse is a
     circle). The default number of points is 1000.
 
@@ -100,7 +114,7 @@ def ellipse(*args, num_points=1e3, **kwargs):
     loosely based on the forum post at
     http://www.sosmath.com/CBB/viewtopic.php?t=17029
     """
-    t = numpy.linspace(0, 2 * math.pi, num_points)
+    t = numpy.linspace(0, 2 * math.pi, int(num_points))
 
     coeffCount = len(args)
     if 5 <= coeffCount <= 6:
@@ -113,51 +127,64 @@ def ellipse(*args, num_points=1e3, **kwargs):
             raise ValueError('Only num_points can be a keyword '
                              'for quadratic form of ellipse')
 
-        discriminant = b**2 - 4 * a * c
+        discriminant = b * b - 4 * a * c
         if discriminant >= 0.0:
             name = 'parabloa' if discriminant == 0.0 else 'hyperbola'
             raise ValueError('Discriminant shows this to be '
                              'a {}, not an ellipse'.format(name))
         if b == 0:
-            theta = 0
+            sin, cos = 0.0, 1.0
         else:
             theta = 0.5 * math.atan(b / (a - c))
             sin = math.sin(theta)
             cos = math.cos(theta)
-            aa = a * cos**2 + b * sin * cos + c * sin**2
-            cc = a * sin**2 - b * sin * cos + c * cos**2
+            sin2 = sin * sin
+            cos2 = cos * cos
+            sincos = sin * cos
+            aa = a * cos2 + b * sincos + c * sin2
+            cc = a * sin2 - b * sincos + c * cos2
             dd = d * cos + e * sin
             ee = -d * sin + e * cos
             a, b, c, d, e = aa, 0, cc, dd, ee
-        ax_x = 1.0 / math.sqrt(a)
-        ax_y = 1.0 / math.sqrt(c)
-        scale = math.sqrt(d**2 / (4 * a) + e**2 / (4 * c) - f)
+        scale = math.sqrt(d * d / (4 * a) + e * e / (4 * c) - f)
+        ax_x = scale / math.sqrt(a)
+        ax_y = scale / math.sqrt(c)
         h = -d / (2 * a)
         k = -e / (2 * c)
-        x = xx = h + ax_x * scale * numpy.sin(t)
-        y = yy = k + ax_y * scale * numpy.cos(t)
-        if theta:
-            x = xx * cos - yy * sin
-            y = xx * sin + yy * cos
+        # The center is found in the unrotated frame
+        h, k = h * cos - k * sin, h * sin + k * cos
     elif coeffCount == 4:
         ax_x, ax_y, h, k = args
-        x = xx = ax_x * numpy.sin(t)
-        y = yy = ax_y * numpy.cos(t)
         theta = float(kwargs.pop('theta', 0.0))
-        if theta:
-            sin = math.sin(theta)
-            cos = math.cos(theta)
-            x = h + xx * cos - yy * sin
-            y = k + xx * sin + yy * cos
+        sin = math.sin(theta)
+        cos = math.cos(theta)
         if kwargs:
            raise ValueError('Only num_points and theta can be a keyword '
                             'argument for simple form of ellipse')
     else:
         raise ValueError('Argument list must have 4 to 6 positional elements')
 
+    # Fold the rotation into the scalar coefficients of sin(t) and cos(t)
+    sin_t = numpy.sin(t)
+    cos_t = numpy.cos(t)
+    x = h + (ax_x * cos) * sin_t - (ax_y * sin) * cos_t
+    y = k + (ax_x * sin) * sin_t + (ax_y * cos) * cos_t
+
     return x, y
 
 
+def _first_true(mask):
+    """
+    Find the index of the first `True` element of a boolean array, or
+    -1 if there is none, stopping as soon as it is found.
+    """
+    if mask.size:
+        index = numpy.argmax(mask)
+        if mask[index]:
+            return index
+    return -1
+
+
 def full_width_half_max(x, y, factor=0.5, baseline=0.0, interp='linear', *,
                         return_points=False):
     """
@@ -197,21 +224,23 @@ def full_width_half_max(x, y, factor=0.5, baseline=0.0, interp='linear', *,
         factor = math.exp(-0.25)
     # Also can be written as factor * y[imax] + (1.0 - factor) * baseline
     halfmax = factor * (y[imax] - baseline) + baseline
+    # There are no crossings at all unless the max is above the threshold.
+    # If it is, the nearest points at or below the threshold on either
+    # side of the max bound the last rising and first falling crossings.
     # Always use <= to allow first and last y-value if they match exactly.
-    rising = (y[:imax] <= halfmax) & (y[1:imax + 1] > halfmax)
-    falling = (y[imax:-1] > halfmax) & (y[imax + 1:] <= halfmax)
-    if not numpy.any(rising):
+    above = y[imax] > halfmax
+    left = _first_true(y[:imax][::-1] <= halfmax) if above else -1
+    if left < 0:
         raise ValueError(
             'left edge does not fall below {} of max'.format(factor)
         )
-    if not numpy.any(falling):
+    right = _first_true(y[imax + 1:] <= halfmax) if above else -1
+    if right < 0:
         raise ValueError(
             'right edge does not fall below {} of max'.format(factor)
         )
-    # Select last rising, first falling index.
-    # Initial [0] because of nonzero's weird tuple return
-    rising_index = numpy.nonzero(rising)[0][-1] + numpy.arange(2)
-    falling_index = numpy.nonzero(falling)[0][0] + imax + numpy.arange(2)
+    rising_index = imax - 1 - left + numpy.arange(2)
+    falling_index = imax + right + numpy.arange(2)
     if interp == 'linear':
         def linterp(x0, x1, y0, y1, y):
             return x0 + (x1 - x0) * (y - y0) / (y1 - y0)
@@ -240,11 +269,11 @@ def full_width_half_max(x, y, factor=0.5, baseline=0.0, interp='linear', *,
 
 def primes_up_to(n):
     """
-    Generate a set containing all the primes less than or equal to `n`.
+    Generate an array containing all the primes less than `n`.
 
     `n` must be a number that represents an array size that can exist
-    in memory. The implementation uses an extremely unoptimized version
-    of the sieve of Eratosthenes.
+    in memory. The implementation uses a boolean sieve of Eratosthenes,
+    striking out multiples of each prime up to ``isqrt(n)``.
 
     Parameters
     ----------
@@ -254,15 +283,15 @@ def primes_up_to(n):
 
     Return
     ------
-    primes : set
-        A set of all the primes less than `n`.
+    primes : numpy.ndarray
+        A sorted array of all the primes less than `n`.
     """
-    sieve = numpy.arange(2, n, dtype=numpy.int_)
-    for i in range(n - 2):
-        p = sieve[i]
-        if p:
-            sieve[i+p::p] = 0
-    return sieve[numpy.nonzero(sieve)]
+    sieve = numpy.ones(max(n, 2), dtype=numpy.bool_)
+    sieve[:2] = False
+    for i in range(2, _isqrt(max(n, 0)) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = False
+    return numpy.nonzero(sieve)[0]
 
 
 def first_primes(n):
@@ -271,8 +300,8 @@ def first_primes(n):
 
     This is a toy method that should probably not be used for large
     prime numbers. Instead of actively discarding all multiples of
-    found primes, it checks new candidates against each element of the
-    current set of primes.
+    found primes, it checks odd candidates against the primes found so
+    far, up to the square root of the candidate.
 
     Parameters
     ----------
@@ -282,13 +311,20 @@ def first_primes(n):
     ------
     primes : set
     """
-    primes = set()
-    for i in itertools.count(2):
-        if all(i % p for p in primes):
-            primes.add(i)
-        if len(primes) == n:
-            break
-    return primes
+    if n <= 0:
+        return set()
+    primes = [2]
+    candidate = 3
+    while len(primes) < n:
+        limit = _isqrt(candidate)
+        for p in primes:
+            if p > limit:
+                primes.append(candidate)
+                break
+            if not candidate % p:
+                break
+        candidate += 2
+    return set(primes)
 
 
 def count_divisors(n):
@@ -296,17 +332,22 @@ def count_divisors(n):
     Counts the divisors of natural number `n`, including 1 and itself.
 
     For example, ``28`` has divisors ``1, 2, 4, 7, 14, 28``, so
-    ``count_divisors(28) == 7``.
+    ``count_divisors(28) == 6``.
+
+    Candidates up to the square root of `n` are tested in a single
+    vectorized operation, except for small `n`, or `n` too large to fit
+    in an ``int64``, where a plain loop is used instead.
     """
-    count = 0
-    limit = int(math.sqrt(n))
-    # Add one if the number is a square (limit won't be part of loop)
-    extra = (limit**2 == n)
-    for i in range(2, limit):
-        if not n % i:
-            count += 1
-    # Add one to count because loop does not check if 1/n are factors
-    return (count + 1) * 2 + extra
+    limit = _isqrt(n)
+    if 64 <= limit and n < 2**63:
+        count = int(numpy.count_nonzero(
+            n % numpy.arange(2, limit + 1, dtype=numpy.int64) == 0
+        ))
+    else:
+        count = sum(1 for i in range(2, limit + 1) if not n % i)
+    # Add one to count because loop does not check if 1/n are factors,
+    # and do not count the square root of a perfect square twice
+    return (count + 1) * 2 - (limit * limit == n)
 
 
 def real_divide(a, b, zero=0, out=None):
@@ -332,13 +373,21 @@ def real_divide(a, b, zero=0, out=None):
         `b`, except that elements corresponding to zeros in `b` are set
         to `zero` instead of actually being computed.
     """
-    mask = (b != 0)
-    result = numpy.true_divide(a, b, where=mask, out=out)
-    if result.ndim > 0:
-        result[~mask] = zero
-    elif ~mask:
-        result = zero
-    return result
+    mask = numpy.not_equal(b, 0)
+    if out is None:
+        shape = numpy.broadcast(a, b).shape
+        if not shape:
+            return numpy.true_divide(a, b) if mask else zero
+        # Python scalars stay weakly typed, like in the ufunc itself
+        dtype = numpy.result_type(*(
+            x if numpy.isscalar(x) else numpy.asanyarray(x) for x in (a, b)
+        ), 1.0)
+        # Masked elements are never touched by the division
+        out = numpy.full(shape, zero, dtype=dtype)
+        return numpy.true_divide(a, b, where=mask, out=out)
+    numpy.true_divide(a, b, where=mask, out=out)
+    numpy.copyto(out, zero, where=~mask)
+    return out
 
 
 _thresholding_directions = {
@@ -348,10 +397,52 @@ _thresholding_directions = {
     'gt': numpy.greater,       '>': numpy.greater,
 }
 
+
+def _is_plain_float64(x):
+    """
+    Check if `x` can be reduced with :py:func:`numpy.vdot` without
+    losing precision, masks or other subclass behavior.
+    """
+    return type(x) is numpy.ndarray and x.dtype == numpy.float64
+
+
+def _threshold_std(x, n):
+    """
+    Mean plus `n` standard deviations of `x`, computing the mean once.
+    """
+    if not _is_plain_float64(x):
+        return numpy.mean(x) + n * numpy.std(x)
+    mean = x.mean()
+    dev = numpy.subtract(x, mean).ravel()
+    return mean + n * numpy.sqrt(numpy.vdot(dev, dev) / dev.size)
+
+
+def _threshold_rms(x, n):
+    """
+    `n` times the RMS of `x`, without a temporary array of squares.
+    """
+    if not _is_plain_float64(x):
+        return n * numpy.sqrt(numpy.square(x).mean())
+    x = x.ravel()
+    return n * numpy.sqrt(numpy.vdot(x, x) / x.size)
+
+
+def _threshold_iqr(x, n):
+    """
+    Median plus `n` interquartile ranges of `x`, from a single
+    percentile call.
+    """
+    # A float64 array of percentiles would promote smaller floats
+    q = numpy.array([25, 50, 75],
+                    dtype=x.dtype if x.dtype.kind == 'f' else None)
+    q25, q50, q75 = numpy.percentile(x, q)
+    return q50 + n * (q75 - q25)
+
+
 _thresholding_types = {
-    'std': lambda x, n: numpy.mean(x) + n * numpy.std(x),
-    'iqr': lambda x, n: numpy.median(x) + n * iqr(x),
-    'rms': lambda x, n: n * numpy.sqrt(numpy.square(x).mean()),
+    'std': _threshold_std,
+    'iqr': _threshold_iqr,
+    'rms': _threshold_rms,
     'raw': lambda x, n: n,
 }
 
@@ -407,6 +498,18 @@ def threshold(arr, thresh=3, type='std', direction='le'):
     return dmethod(arr, tmethod(arr, thresh))
 
 
+def _fmod_positive(diff, full):
+    """
+    Compute ``fmod(fmod(diff, full) + full, full)``, reusing the
+    intermediate array for the last two steps when there is one.
+    """
+    diff = numpy.fmod(diff, full)
+    if isinstance(diff, numpy.ndarray):
+        numpy.add(diff, full, out=diff)
+        return numpy.fmod(diff, full, out=diff)
+    return numpy.fmod(diff + full, full)
+
+
 def ang_diff_pos(theta1, theta2, full=2.0 * numpy.pi):
     r"""
     Find the positive angular difference from `theta1` to `theta2`,
@@ -438,7 +541,7 @@ def ang_diff_pos(theta1, theta2, full=2.0 * numpy.pi):
         An array containing the broadcasted positive normalized
         difference of the two inputs.
     """
-    return numpy.fmod(numpy.fmod(theta2 - theta1, full) + full, full)
+    return _fmod_positive(theta2 - theta1, full)
 
 
 def ang_diff_min(theta1, theta2, full=2.0 * numpy.pi):
@@ -477,9 +580,10 @@ def ang_diff_min(theta1, theta2, full=2.0 * numpy.pi):
         difference of the two inputs with the smallest absolute value.
     """
     half = 0.5 * full
-    # Broken out for readability
-    step1 = numpy.fmod(theta2 - theta1 + half, full)
-    return numpy.fmod(step1 + full, full) - half
+    diff = _fmod_positive(theta2 - theta1 + half, full)
+    if isinstance(diff, numpy.ndarray):
+        return numpy.subtract(diff, half, out=diff)
+    return diff - half
 
 
 def ang_diff_abs(theta1, theta2, full=2.0 * numpy.pi):
@@ -513,7 +617,10 @@ def ang_diff_abs(theta1, theta2, full=2.0 * numpy.pi):
         An array containing the broadcasted minimum absolute normalized
         difference of the two inputs.
     """
-    return numpy.abs(ang_diff_min(theta1, theta2, full))
+    diff = ang_diff_min(theta1, theta2, full)
+    if isinstance(diff, numpy.ndarray):
+        return numpy.abs(diff, out=diff)
+    return numpy.abs(diff)
 
 
 def rms(arr, axis=None, bias=0, weights=None, ddof=0, out=None):
@@ -554,18 +661,47 @@ def rms(arr, axis=None, bias=0, weights=None, ddof=0, out=None):
         The RMS of `arr` about `bias` along `axis`.
     """
     sq = numpy.square(numpy.asanyarray(arr) - bias, out=out)
-    weights = numpy.array([1]) if weights is None \
-                                            else numpy.asanyarray(weights)
     if axis is None:
         sq = sq.ravel()
-        weights = weights.ravel()
+        axis = 0
+        if weights is not None:
+            weights = numpy.ravel(weights)
     else:
         axis = numpy.core.multiarray.normalize_axis_index(axis, sq.ndim)
-        if weights.ndim < sq.ndim:
-            weights = numpy.reshape(weights,
-                                    weights.shape + (1,) * (sq.ndim - axis - 1))
+
+    if weights is None:
+        # Accumulate in the same type as the old implicit weights of one
+        total = numpy.sum(sq, axis=axis, out=out,
+                          dtype=numpy.result_type(sq.dtype, numpy.int_))
+        return numpy.sqrt(total / (sq.shape[axis] - ddof), out=out)
+
+    weights = numpy.asanyarray(weights)
+    if weights.ndim < sq.ndim:
+        weights = numpy.reshape(weights,
+                                weights.shape + (1,) * (sq.ndim - axis - 1))
     weights = numpy.broadcast_to(weights, sq.shape)
-    return numpy.sqrt(numpy.sum(sq * weights, axis=axis, out=out) / (weights.sum(axis=axis) - ddof), out=out)
+    if type(sq) is numpy.ndarray:
+        # Multiply and reduce in one pass
+        total = numpy.einsum('...i,...i->...', numpy.moveaxis(sq, axis, -1),
+                             numpy.moveaxis(weights, axis, -1), out=out)
+    else:
+        # einsum would discard masks and other subclass behavior
+        total = numpy.sum(sq * weights, axis=axis, out=out)
+    return numpy.sqrt(total / (weights.sum(axis=axis) - ddof), out=out)
+
+
+def _inner(a, b, axis):
+    """
+    Dot product of `a` and `b` along `axis`, keeping dimensions.
+
+    Unlike ``(a * b).sum(axis=axis, keepdims=True)``, this does not
+    allocate the full product before reducing it.
+    """
+    if axis is None:
+        return numpy.einsum('i,i', a.ravel(), b.ravel()).reshape((1,) * a.ndim)
+    a = numpy.moveaxis(a, axis, -1)
+    b = numpy.moveaxis(b, axis, -1)
+    return numpy.expand_dims(numpy.einsum('...i,...i->...', a, b), axis)
 
 
 def segment_distance(p, p1, p2, axis=None, return_t=False, segment=True):
@@ -659,20 +795,14 @@ def segment_distance(p, p1, p2, axis=None, return_t=False, segment=True):
     """
     p, p1, p2 = numpy.broadcast_arrays(p, p1, p2)
     seg = p2 - p1
-    norm2_seg = (seg * seg).sum(axis=axis, keepdims=True)
-    t = ((p - p1) * seg).sum(axis=axis, keepdims=True) / norm2_seg
-    p0 = p1 + t * seg
-
-    if segment:
-        dist = numpy.empty_like(p0)
-        mask1 = t < 0
-        mask2 = t > 1
-        numpy.subtract(p0, p, where=~(mask1 | mask2), out=dist)
-        numpy.subtract(p1, p, where=mask1, out=dist)
-        numpy.subtract(p2, p, where=mask2, out=dist)
-    else:
-        dist = p0 - p
-    dist = numpy.square(dist, out=dist).sum(axis=axis, keepdims=True)
+    # Offset of the point from the start of the line: p - p0 = d - t * seg
+    d = p - p1
+    t = _inner(d, seg, axis) / _inner(seg, seg, axis)
+
+    # Clamping t to the segment selects p1 or p2 past either end
+    dist = (numpy.clip(t, 0, 1) if segment else t) * seg
+    dist -= d
+    dist = _inner(dist, dist, axis)
     numpy.sqrt(dist, out=dist)
 
     if axis is None or seg.ndim == 1:
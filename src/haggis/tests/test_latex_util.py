@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+# haggis: a library of general purpose utilities
+#
+# Copyright (C) 2023  Joseph R. Fox-Rabinovitz <jfoxrabinovitz at gmail dot com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Author: Joseph Fox-Rabinovitz <jfoxrabinovitz at gmail dot com>
+
+
+"""
+Tests for the :py:mod:`haggis.latex_util` module.
+"""
+
+from io import BytesIO
+import os
+from subprocess import CalledProcessError
+import sys
+
+from pytest import fixture, mark, raises
+
+from .. import latex_util
+from ..latex_util import _copy_output, render_latex_batch
+
+
+#: Stands in for :program:`latex`. The DVI file just records the
+#: number of formulas in the source.
+_latex_stub = """
+import os, sys
+directory = [arg.split('=', 1)[1] for arg in sys.argv
+             if arg.startswith('-output-directory=')][0]
+source = sys.argv[-1]
+with open(source) as file:
+    count = file.read().count(r'\\begin{formula}')
+with open(os.path.join(directory, source[:-4] + '.dvi'), 'w') as file:
+    file.write(str(count))
+"""
+
+
+#: Stands in for :program:`dvipng`, which expands ``%d`` without
+#: padding.
+_dvipng_stub = """
+import sys
+output = sys.argv[sys.argv.index('-o') + 1]
+with open(sys.argv[-1]) as file:
+    count = int(file.read())
+for page in range(1, count + 1):
+    with open(output % page, 'w') as file:
+        file.write('png {}'.format(page))
+"""
+
+
+#: Stands in for :program:`dvisvgm`, which expands ``%p`` padded to the
+#: optional width that precedes it. Without a width, the padding here
+#: matches the number of pages, so the width must always be given.
+_dvisvgm_stub = """
+import re, sys
+output = [arg.split('=', 1)[1] for arg in sys.argv
+          if arg.startswith('--output=')][0]
+with open(sys.argv[-1]) as file:
+    count = int(file.read())
+for page in range(1, count + 1):
+    def expand(match):
+        return str(page).zfill(int(match.group(1) or len(str(count))))
+    name = re.sub(r'%(\\d?)p', expand, output)
+    with open(name, 'w') as file:
+        file.write('svg {}'.format(page))
+"""
+
+
+#: Stands in for any program that fails.
+_failure_stub = """
+import sys
+sys.exit(3)
+"""
+
+
+class TestCopyOutput:
+    @fixture
+    def source(self, tmp_path):
+        name = tmp_path / 'source.png'
+        name.write_bytes(b'image data')
+        return str(name)
+
+    def test_name(self, source, tmp_path):
+        name = str(tmp_path / 'output.png')
+        _copy_output(source, name)
+        with open(name, 'rb') as file:
+            assert file.read() == b'image data'
+
+    def test_memory(self, source):
+        file = BytesIO(b'xyz')
+        file.seek(0, 2)
+        _copy_output(source, file)
+        assert file.getvalue() == b'xyzimage data'
+
+    def test_append(self, source, tmp_path):
+        name = str(tmp_path / 'output.png')
+        with open(name, 'wb') as file:
+            file.write(b'header ')
+        with open(name, 'ab') as file:
+            _copy_output(source, file)
+            file.write(b' trailer')
+        with open(name, 'rb') as file:
+            assert file.read() == b'header image data trailer'
+
+    def test_offset(self, source, tmp_path):
+        name = str(tmp_path / 'output.png')
+        with open(name, 'wb') as file:
+            file.write(b'header ')
+            _copy_output(source, file)
+            file.write(b' trailer')
+        with open(name, 'rb') as file:
+            assert file.read() == b'header image data trailer'
+
+
+@mark.skipif(os.name == 'nt', reason='Stub programs need a shebang')
+class TestRenderLatexBatch:
+    @fixture(autouse=True)
+    def stubs(self, tmp_path, monkeypatch):
+        for attr, code in [('latex_exe', _latex_stub),
+                           ('dvipng_exe', _dvipng_stub),
+                           ('dvisvgm_exe', _dvisvgm_stub)]:
+            monkeypatch.setattr(latex_util, attr,
+                                self.make_stub(tmp_path, attr, code))
+
+    @staticmethod
+    def make_stub(tmp_path, name, code):
+        stub = tmp_path / name
+        stub.write_text('#!{}\n{}'.format(sys.executable, code))
+        stub.chmod(0o755)
+        return str(stub)
+
+    def test_empty(self):
+        assert render_latex_batch([]) == []
+        assert render_latex_batch([], []) == []
+
+    def test_length_mismatch(self):
+        with raises(ValueError):
+            render_latex_batch(['x', 'y'], [BytesIO()])
+        with raises(ValueError):
+            render_latex_batch(['x'], [BytesIO(), BytesIO()])
+
+    @mark.parametrize('format', ['png', 'svg'])
+    def test_rewind(self, format):
+        files = render_latex_batch(['x', 'y', 'z'], format=format)
+        assert len(files) == 3
+        for index, file in enumerate(files, 1):
+            assert isinstance(file, BytesIO)
+            assert file.tell() == 0
+            assert file.read() == '{} {}'.format(format, index).encode()
+
+    def test_no_rewind(self):
+        files = [BytesIO(), BytesIO()]
+        result = render_latex_batch(['x', 'y'], files)
+        assert result == files
+        assert [file.tell() for file in files] == [5, 5]
+
+    @mark.parametrize('format', ['png', 'svg'])
+    def test_many_pages(self, format):
+        count = 12
+        files = render_latex_batch(['x_{}'.format(i) for i in range(count)],
+                                   format=format)
+        assert [file.read() for file in files] == [
+            '{} {}'.format(format, index).encode()
+            for index in range(1, count + 1)
+        ]
+
+    def test_names(self, tmp_path):
+        names = [str(tmp_path / 'f{}.svg'.format(i)) for i in range(2)]
+        assert render_latex_batch(['x', 'y'], names, format='svg') == names
+        for index, name in enumerate(names, 1):
+            with open(name) as file:
+                assert file.read() == 'svg {}'.format(index)
+
+    @mark.parametrize('format, attr', [('png', 'dvipng_exe'),
+                                       ('svg', 'dvisvgm_exe')])
+    def test_engine_failure(self, format, attr, tmp_path, monkeypatch):
+        monkeypatch.setattr(latex_util, attr,
+                            self.make_stub(tmp_path, 'fail', _failure_stub))
+        with raises(CalledProcessError):
+            render_latex_batch(['x'], format=format)
@@ -128,6 +128,15 @@ class TestModuleAsDict:
         assert config['c'] == 3
         assert config['d'] == 42
 
+    def test_cycle(self):
+        loaded = []
+        with chdir_context(DATA_DIR):
+            config = module_as_dict('cycle_module_0.txt', injection=loaded,
+                                    injection_var='loaded')
+        assert loaded == ['cycle_module_0', 'cycle_module_1']
+        assert config['a'] == 1
+        assert config['b'] == 3
+
     def test_skip_dunder(self):
         config = module_as_dict(join(DATA_DIR, 'module.txt'),
                                 skip_dunder=False)
@@ -30,13 +30,15 @@ from contextlib import contextmanager
 from io import StringIO
 import logging
 import sys
+from time import monotonic, sleep
 from warnings import catch_warnings
 
 from pytest import fixture, raises
 
 from ..logs import (
     KEEP, KEEP_WARN, OVERWRITE, OVERWRITE_WARN, RAISE,
-    add_logging_level, reset_handlers, LogMaxFilter, MetaLoggableType
+    add_logging_level, reset_handlers, LogMaxFilter, MetaLoggableType,
+    _BufferedHandler
 )
 
 
@@ -457,6 +459,28 @@ class TestLogMaxFilter(LoggingTestBase):
         raises(TypeError, LogMaxFilter, '_NOTALEVEL32', inclusive=False)
 
 
+class TestBufferedHandler:
+    def test_periodic_flush(self):
+        """
+        Verify that a lone record is written without any later traffic.
+        """
+        stream = StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter('%(message)s'))
+        handler = _BufferedHandler(target, interval=0.05)
+        try:
+            handler.handle(logging.makeLogRecord({'msg': 'lone',
+                                                   'levelno': logging.INFO}))
+            assert stream.getvalue() == ''
+            deadline = monotonic() + 5.0
+            while not stream.getvalue() and monotonic() < deadline:
+                sleep(0.01)
+            assert stream.getvalue() == 'lone\n'
+        finally:
+            handler.close()
+        assert not handler._flusher.is_alive()
+
+
 class TestMetaLoggableType:
     def test_regular(self):
         class Test(metaclass=MetaLoggableType):
@@ -491,3 +515,18 @@ class TestMetaLoggableType:
         assert isinstance(Test.logger, logging.Logger)
         assert Test.logger.name == expected_name
         assert logging.getLogger(expected_name) is Test.logger
+
+    def test_lazy(self):
+        """ Verify that the logger is only created when it is needed. """
+        class Test(metaclass=MetaLoggableType):
+            __namespace__ = 'lazy'
+
+        class Child(Test):
+            pass
+
+        expected_name = Test.__namespace__ + '.' + Test.__module__ + '.' + Test.__qualname__
+
+        assert expected_name not in logging.Logger.manager.loggerDict
+        assert Test().logger is logging.getLogger(expected_name)
+        assert vars(Test)['logger'] is Test.logger
+        assert Child.logger.name.endswith('.Child')
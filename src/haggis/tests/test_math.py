@@ -29,7 +29,10 @@ import numpy
 from numpy.testing import assert_allclose, assert_array_equal
 from pytest import raises
 
-from ..math import segment_distance, real_divide
+from ..math import (
+    count_divisors, ellipse, first_primes, full_width_half_max,
+    primes_up_to, real_divide, segment_distance, threshold
+)
 from .util import plotting_context, save
 
 
@@ -282,3 +285,130 @@ class TestSegmentDistance:
         p2 = [[1, 2], [3, 4]]
         with raises(ValueError, match='broadcast'):
             segment_distance(p, p1, p2)
+
+
+class TestEllipse:
+    def test_simple(self):
+        x, y = ellipse(2, 1, 3, -1)
+        assert x.shape == y.shape == (1000,)
+        assert_allclose(((x - 3) / 2)**2 + (y + 1)**2, 1.0)
+
+    def test_rotated(self):
+        x, y = ellipse(2, 1, 3, -1, theta=numpy.pi / 2, num_points=9)
+        assert x.shape == y.shape == (9,)
+        assert_allclose((x - 3)**2 + ((y + 1) / 2)**2, 1.0)
+
+    def test_quadratic(self):
+        # (x - 1)**2 / 4 + y**2 = 1
+        x, y = ellipse(1, 4, -2, 0, -3, num_points=50)
+        assert_allclose(x**2 + 4 * y**2 - 2 * x - 3, 0.0, atol=1e-12)
+
+
+class TestRealDivide:
+    def test_scalar(self):
+        assert real_divide(1, 2) == 0.5
+        assert real_divide(1, 0) == 0
+        assert real_divide(1.0, 0.0, zero=5) == 5
+
+    def test_array(self):
+        result = real_divide([1, 2, 3], [0, 4, 0], zero=-1)
+        assert_array_equal(result, [-1, 0.5, -1])
+        assert result.dtype == numpy.float64
+
+        result = real_divide(numpy.ones((2, 1), dtype=numpy.float32),
+                             numpy.array([0, 2], dtype=numpy.float32))
+        assert_array_equal(result, [[0, 0.5], [0, 0.5]])
+        assert result.dtype == numpy.float32
+
+    def test_out(self):
+        out = numpy.full(3, 7.0)
+        result = real_divide([1, 2, 3], [2, 0, 1], out=out)
+        assert result is out
+        assert_array_equal(out, [0.5, 0, 3])
+
+
+class TestCountDivisors:
+    def test_small(self):
+        for n in range(1, 200):
+            expected = sum(1 for d in range(1, n + 1) if not n % d)
+            assert count_divisors(n) == expected
+
+    def test_large(self):
+        assert count_divisors(2**20) == 21
+        assert count_divisors(2**10 * 3**5) == 66
+        assert count_divisors(10007 * 10009) == 4
+
+
+class TestPrimes:
+    def test_primes_up_to(self):
+        for n in (-1, 0, 1, 2):
+            assert primes_up_to(n).size == 0
+        assert_array_equal(primes_up_to(3), [2])
+        assert_array_equal(primes_up_to(30),
+                           [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+        assert_array_equal(primes_up_to(31),
+                           [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+        assert_array_equal(primes_up_to(32)[-2:], [29, 31])
+        assert primes_up_to(10000).size == 1229
+
+    def test_first_primes(self):
+        assert first_primes(0) == set()
+        assert first_primes(1) == {2}
+        assert first_primes(10) == {2, 3, 5, 7, 11, 13, 17, 19, 23, 29}
+        assert first_primes(1229) == set(primes_up_to(10000).tolist())
+
+
+class TestFullWidthHalfMax:
+    x = numpy.arange(9.0)
+    y = numpy.array([0, 1, 2, 3, 4, 3, 2, 1, 0])
+
+    def test_linear(self):
+        assert_allclose(full_width_half_max(self.x, self.y), 4.0)
+        width, rising, falling = full_width_half_max(
+            self.x, self.y, factor=0.6, return_points=True
+        )
+        assert_allclose(width, 3.2)
+        assert_allclose(rising, (2.4, 2.4))
+        assert_allclose(falling, (5.6, 2.4))
+
+    def test_nearest(self):
+        width, rising, falling = full_width_half_max(
+            self.x, self.y, factor=0.6, interp='nearest', return_points=True
+        )
+        assert width == 4.0
+        assert rising == (2.0, 2.0)
+        assert falling == (6.0, 2.0)
+
+    def test_gaussian(self):
+        x = numpy.linspace(-5, 5, 10001)
+        y = numpy.exp(-0.5 * x**2)
+        assert_allclose(full_width_half_max(x, y),
+                        2 * numpy.sqrt(2 * numpy.log(2)), rtol=1e-6)
+
+    def test_edges(self):
+        with raises(ValueError, match='left edge'):
+            full_width_half_max(self.x[:5], self.y[4:])
+        with raises(ValueError, match='right edge'):
+            full_width_half_max(self.x[:5], self.y[:5])
+        with raises(ValueError, match='left edge'):
+            full_width_half_max(self.x, self.y, factor=1.0)
+
+
+class TestThreshold:
+    def test_iqr(self):
+        arr = numpy.arange(1, 10)
+        assert threshold(arr, 1, 'iqr').all()
+        assert_array_equal(threshold(arr, 0.5, 'iqr'), arr <= 7)
+        assert_array_equal(threshold(arr, 0.5, 'iqr', '>'), arr > 7)
+
+    def test_iqr_float32(self):
+        arr = numpy.arange(1, 10, dtype=numpy.float32)
+        assert_array_equal(threshold(arr, 0.25, 'iqr'), arr <= 6)
+
+    def test_std_rms(self):
+        arr = numpy.array([1.0, 3.0, 1.0, 3.0])
+        assert_array_equal(threshold(arr, 1, 'std'), [True] * 4)
+        assert_array_equal(threshold(arr, 0.5, 'std', '<'),
+                           [True, False, True, False])
+        assert_array_equal(threshold(arr, 1, 'rms', '>='),
+                           [False, True, False, True])